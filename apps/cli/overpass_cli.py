@@ -1,51 +1,271 @@
 #!/usr/bin/env python3
 import argparse
+import functools
+import re
 import sys
-import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, List, Optional
 
-# Add the project root to the Python path to import modules
-current_dir = os.path.dirname(os.path.abspath(__file__))
-project_root = os.path.dirname(os.path.dirname(current_dir))
-sys.path.insert(0, project_root)
+if TYPE_CHECKING:
+    from concurrent.futures import Future, ThreadPoolExecutor
 
-# Add src directory to Python path to import overpass_ql_gen
-src_path = os.path.join(project_root, 'src')
-sys.path.insert(0, src_path)
+    from overpass_ql_gen.testing.overpass_functional_tester import OverpassFunctionalTester
 
-from overpass_ql_gen.oql_generator.generator import generate_query, OverpassQLError
-
-# Import functional testing framework
+# Use orjson's C encoder for dumping large Overpass results when available,
+# falling back to the stdlib json module.
 try:
-    from overpass_ql_gen.testing.overpass_functional_tester import OverpassFunctionalTester, FunctionalTest, TestStatus
-    FUNCTIONAL_TESTING_AVAILABLE = True
+    import orjson
+
+    def _dump_result_bytes(result: Any, pretty: bool = False) -> bytes:
+        return orjson.dumps(result, option=orjson.OPT_INDENT_2 if pretty else 0)
 except ImportError:
-    FUNCTIONAL_TESTING_AVAILABLE = False
-    print("Warning: Functional testing framework not available. Install dependencies to enable testing features.")
+    import json
 
-def main() -> None:
+    def _dump_result_bytes(result: Any, pretty: bool = False) -> bytes:
+        return json.dumps(result, indent=2 if pretty else None).encode()
+
+
+def _write_result_file(result: Any, path: str, pretty: bool = False) -> None:
+    """Write an Overpass result to disk, streaming element-by-element.
+
+    Compact output (the default) streams each element separately so a single
+    100 MB+ JSON string is never materialized in memory; --pretty falls back
+    to one indented dump.
     """
-    Main function for the Overpass QL generator CLI.
+    with open(path, 'wb', buffering=1 << 20) as f:
+        elements = result.get('elements') if isinstance(result, dict) else None
+        if pretty or not isinstance(elements, list):
+            f.write(_dump_result_bytes(result, pretty=pretty))
+            return
+        f.write(b'{')
+        for key, value in result.items():
+            if key != 'elements':
+                f.write(_dump_result_bytes(key) + b':' + _dump_result_bytes(value) + b',')
+        f.write(b'"elements":[')
+        for i, elem in enumerate(elements):
+            if i:
+                f.write(b',')
+            f.write(_dump_result_bytes(elem))
+        f.write(b']}')
+
+# In-repo fallback for running the script directly without installing the
+# package; the installed `overpass-cli` entry point does not need this.
+_root = Path(__file__).resolve().parents[2]
+if str(_root) not in sys.path:
+    sys.path[:0] = [str(_root), str(_root / 'src')]
+
+from overpass_ql_gen.oql_generator.generator import generate_query, OverpassQLError, OverpassQuery
+
+# Emoji glyphs only when stdout is an interactive UTF terminal; plain ASCII
+# markers otherwise (pipelines, CI, non-UTF consoles)
+_RICH = sys.stdout.isatty() and (getattr(sys.stdout, 'encoding', '') or '').lower().startswith('utf')
+_G = {
+    'search': '\U0001f50d' if _RICH else '[..]',
+    'chart': '\U0001f4ca' if _RICH else '[*]',
+    'stats': '\U0001f4c8' if _RICH else '[#]',
+    'target': '\U0001f3af' if _RICH else '[~]',
+    'ok': '\u2705' if _RICH else '[OK]',
+    'fail': '\u274c' if _RICH else '[FAIL]',
+    'warn': '\u26a0\ufe0f' if _RICH else '[WARN]',
+    'save': '\U0001f4be' if _RICH else '[SAVE]',
+}
+
+# Prompt-intent keyword table: singular keyword -> (tag_key, tag_value).
+INTENT_TABLE = {
+    "school": ("amenity", "school"),
+    "university": ("amenity", "university"),
+    "cafe": ("amenity", "cafe"),
+    "restaurant": ("amenity", "restaurant"),
+    "hospital": ("amenity", "hospital"),
+    "park": ("leisure", "park"),
+}
+
+def _pluralize(keyword: str) -> str:
+    """Return the plural form of an intent keyword (e.g. university -> universities)."""
+    return keyword[:-1] + "ies" if keyword.endswith("y") else keyword + "s"
+
+# Map both singular and plural surface forms back to the singular keyword
+_INTENT_FORMS = {form: kw for kw in INTENT_TABLE for form in (kw, _pluralize(kw))}
+
+# Tokenize the prompt once and test O(1) membership per token; unlike a
+# substring scan this is word-boundary correct ("preschool" no longer
+# matches "school")
+_TOKEN_RE = re.compile(r'[a-z]+')
+
+
+def _match_intent(prompt: str) -> Optional[str]:
+    """Return the singular intent keyword for a prompt, or None."""
+    for token in _TOKEN_RE.findall(prompt.casefold()):
+        keyword = _INTENT_FORMS.get(token)
+        if keyword is not None:
+            return keyword
+    return None
+
+def _build_batched_query(queries: List[OverpassQuery], output_format: str = "json") -> str:
+    """Merge several generated queries into one Overpass multi-statement request.
+
+    Each prompt's filters are collected into a named set and the sets are
+    unioned into a single `out body;`, so N prompts cost one HTTP round-trip
+    instead of N (the Overpass server serializes requests per IP).
+    """
+    lines = [f"[out:{output_format}];"]
+    set_names = []
+    for i, query in enumerate(queries):
+        area_expr = ""
+        if query.search_area:
+            lines.append(f'area[name="{query.search_area}"]->.searchArea{i};')
+            area_expr = f"(area.searchArea{i})"
+        parts = []
+        for tag in query.tags:
+            for elem_type in query.elements:
+                parts.append(f'  {elem_type}["{tag.key}"="{tag.value}"]{area_expr};')
+        lines.append("(\n" + "\n".join(parts) + f"\n)->.set{i};")
+        set_names.append(f".set{i};")
+    lines.append("(" + " ".join(set_names) + ");")
+    lines.append("out body;")
+    return "\n".join(lines)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_write_executor() -> "ThreadPoolExecutor":
+    """Single-worker executor for overlapping result-file writes with analysis.
+
+    The GIL is released during file writes, so dumping the full payload to
+    disk can proceed in parallel with the Python-side analysis prints.
     """
+    from concurrent.futures import ThreadPoolExecutor
+    return ThreadPoolExecutor(max_workers=1)
+
+
+def _finish_result_write(future: "Future[None]") -> bool:
+    """Wait for a background result write; report and swallow write errors."""
+    try:
+        future.result()
+        return True
+    except OSError as e:
+        print(f"{_G['fail']} Failed to save results: {e}")
+        return False
+
+
+@functools.lru_cache(maxsize=1)
+def _get_tester() -> "OverpassFunctionalTester":
+    """Return a shared OverpassFunctionalTester so its pooled HTTP session is reused."""
+    from overpass_ql_gen.testing.overpass_functional_tester import OverpassFunctionalTester
+    return OverpassFunctionalTester()
+
+# Template for the reference-comparison report: rendered with one
+# format_map pass and a single write to stdout instead of a print per line
+_CMP_TEMPLATE = (
+    _G['chart'] + " Test Status: {status}\n"
+    + _G['stats'] + " Generated Elements: {gen}\n"
+    + _G['stats'] + " Reference Elements: {ref}\n"
+    + _G['target'] + " Similarity Score: {sim}\n"
+    + "{verdict}"
+)
+
+_OUTPUT_FORMATS = frozenset({"json", "xml", "geojson"})
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the CLI argument parser (done once at import time)."""
     parser = argparse.ArgumentParser(description="Generate Overpass QL from natural language.")
-    parser.add_argument("prompt", type=str, help="The natural language prompt.")
-    parser.add_argument("--format", type=str, default="json", choices=["json", "xml", "geojson"], help="The output format.")
+    parser.add_argument("prompt", type=str, nargs="?", default=None, help="The natural language prompt.")
+    parser.add_argument("--prompt-file", type=str, help="File with one prompt per line; all prompts are merged into a single Overpass request")
+    parser.add_argument("--format", type=str, default="json", choices=_OUTPUT_FORMATS, help="The output format.")
     parser.add_argument("--test", action="store_true", help="Execute the generated query against the Overpass API to get results")
     parser.add_argument("--reference-query", type=str, help="Reference query to compare against (used with --test)")
     parser.add_argument("--output-file", type=str, help="File to save the query results")
-    
+    parser.add_argument("--pretty", action="store_true", help="Pretty-print saved query results (larger and slower for big responses)")
+    parser.add_argument("--verbose", action="store_true", help="Always run the full result analysis, even on very large responses")
+    parser.add_argument("--json-output", action="store_true", help="Emit a single machine-readable JSON line instead of human-readable output")
+    return parser
+
+
+_PARSER = _build_parser()
+
+
+def main() -> None:
+    """
+    Main function for the Overpass QL generator CLI.
+    """
+    parser = _PARSER
     args = parser.parse_args()
 
+    if not args.prompt and not args.prompt_file:
+        parser.error("a prompt or --prompt-file is required")
+
     try:
+        # Batch mode: merge all prompts into one Overpass request
+        if args.prompt_file:
+            with open(args.prompt_file) as f:
+                prompts = [line.strip() for line in f if line.strip()]
+            if not prompts:
+                print("No prompts found in prompt file.")
+                return
+
+            queries = [generate_query(p, output_format=args.format) for p in prompts]
+            batched_query = _build_batched_query(queries, output_format=args.format)
+            print("Generated batched Overpass QL query:")
+            print(batched_query)
+
+            if args.test:
+                try:
+                    from overpass_ql_gen.testing.test_utilities import extract_elements_by_tag
+                except ImportError as e:
+                    print(f"\n{_G['warn']}  Query execution not available. Install dependencies with: uv add pydantic requests ({e})")
+                    return
+
+                tester = _get_tester()
+                print(f"\n{_G['search']} Executing batched query for {len(prompts)} prompts against Overpass API...")
+                raw_result = tester.execute_query(batched_query)
+                if raw_result is None:
+                    print(f"{_G['fail']} Query execution failed")
+                    return
+
+                element_count = len(raw_result.get('elements', []))
+                print(f"{_G['stats']} Query Results: {element_count} elements found")
+                # Attribute elements back to each prompt by its tag filters
+                for prompt, query in zip(prompts, queries):
+                    matched = sum(
+                        len(extract_elements_by_tag(raw_result, tag.key, tag.value))
+                        for tag in query.tags
+                    )
+                    print(f"   - '{prompt}': {matched} matching elements")
+
+                if args.output_file:
+                    _write_result_file(raw_result, args.output_file, pretty=args.pretty)
+                    print(f"{_G['save']} Results saved to: {args.output_file}")
+            return
+
         # Generate query from the prompt
         query_result = generate_query(args.prompt, output_format=args.format)
-        print("Generated Overpass QL query:")
-        print(query_result.query_string)
+        if args.json_output and not args.test:
+            # Machine-readable mode: one JSON line, no human-readable chatter
+            sys.stdout.buffer.write(_dump_result_bytes({'query': query_result.query_string}) + b'\n')
+            return
+        if not args.json_output:
+            print("Generated Overpass QL query:")
+            print(query_result.query_string)
         
         # If test flag is provided, execute the query and check if results match prompt intent
-        if args.test and FUNCTIONAL_TESTING_AVAILABLE:
-            print("\n🔍 Validating that query results match prompt intent...")
-            
-            tester = OverpassFunctionalTester()
+        if args.test:
+            # Lazy-import the functional testing framework so the common
+            # non-testing path never pays the import cost at startup
+            try:
+                from overpass_ql_gen.testing.overpass_functional_tester import OverpassFunctionalTester, FunctionalTest, TestStatus
+                from overpass_ql_gen.testing.test_utilities import (
+                    summarize_result,
+                    extract_elements_by_tag,
+                    count_tag_values
+                )
+            except ImportError as e:
+                print(f"\n{_G['warn']}  Query execution not available. Install dependencies with: uv add pydantic requests ({e})")
+                return
+
+            if not args.json_output:
+                print(f"\n{_G['search']} Validating that query results match prompt intent...")
+
+            tester = _get_tester()
             
             if args.reference_query:
                 # Compare with reference query
@@ -57,129 +277,146 @@ def main() -> None:
                     similarity_threshold=0.8
                 )
                 result = tester.run_single_test(test)
-                
-                print(f"📊 Test Status: {result.status}")
-                print(f"📈 Generated Elements: {result.result_count}")
-                print(f"📈 Reference Elements: {result.reference_count}")
-                print(f"🎯 Similarity Score: {result.similarity_score:.2f}" if result.similarity_score else "🎯 Similarity Score: N/A")
-                
-                if result.status == TestStatus.PASSED:
-                    print("✅ Query validation PASSED - Results are similar to reference query")
-                else:
-                    print("❌ Query validation FAILED - Results differ significantly from reference")
+
+                if args.json_output:
+                    sys.stdout.buffer.write(_dump_result_bytes({
+                        'query': query_result.query_string,
+                        'status': result.status.value,
+                        'count': result.result_count,
+                        'reference_count': result.reference_count,
+                        'similarity': result.similarity_score,
+                    }) + b'\n')
+                    return
+
+                print(_CMP_TEMPLATE.format_map({
+                    'status': result.status,
+                    'gen': result.result_count,
+                    'ref': result.reference_count,
+                    'sim': f"{result.similarity_score:.2f}" if result.similarity_score else "N/A",
+                    'verdict': (
+                        f"{_G['ok']} Query validation PASSED - Results are similar to reference query"
+                        if result.status == TestStatus.PASSED
+                        else f"{_G['fail']} Query validation FAILED - Results differ significantly from reference"
+                    ),
+                }))
                     
             else:
                 # Execute the query and validate that results match the prompt intent
-                print(f"\n🔍 Executing generated query against Overpass API to validate against prompt: '{args.prompt}'")
+                if not args.json_output:
+                    print(f"\n{_G['search']} Executing generated query against Overpass API to validate against prompt: '{args.prompt}'")
                 raw_result = tester.execute_query(query_result.query_string)
                 
                 if raw_result:
-                    element_count = len(raw_result.get('elements', []))
-                    print(f"📈 Query Results: {element_count} elements found")
-                    
-                    # Import utilities to provide detailed analysis and validation
-                    try:
-                        from overpass_ql_gen.testing.test_utilities import (
-                            summarize_result, 
-                            extract_elements_by_tag,
-                            count_tag_values
-                        )
-                        
-                        summary = summarize_result(raw_result)
-                        print(f"📊 Result Analysis:")
-                        print(f"   - Total elements: {summary['total_elements']}")
-                        print(f"   - Element types: {summary['element_types']}")
-                        print(f"   - Common tags: {list(summary['common_tags'].keys())[:5]}")
-                        print(f"   - Has geometry: {summary['has_geometry']}")
-                        
-                        # Analyze if results match the prompt intent
-                        prompt_lower = args.prompt.lower()
-                        matched_elements = 0
-                        
-                        # Check if results contain expected amenities based on prompt keywords
-                        if 'school' in prompt_lower or 'schools' in prompt_lower:
-                            schools = extract_elements_by_tag(raw_result, 'amenity', 'school')
-                            matched_elements = len(schools)
-                            print(f"   - Schools found: {len(schools)}")
-                        
-                        elif 'university' in prompt_lower or 'universities' in prompt_lower:
-                            universities = extract_elements_by_tag(raw_result, 'amenity', 'university')
-                            matched_elements = len(universities)
-                            print(f"   - Universities found: {len(universities)}")
-                        
-                        elif 'cafe' in prompt_lower or 'cafes' in prompt_lower:
-                            cafes = extract_elements_by_tag(raw_result, 'amenity', 'cafe')
-                            matched_elements = len(cafes)
-                            print(f"   - Cafes found: {len(cafes)}")
-                            
-                        elif 'restaurant' in prompt_lower or 'restaurants' in prompt_lower:
-                            restaurants = extract_elements_by_tag(raw_result, 'amenity', 'restaurant')
-                            matched_elements = len(restaurants)
-                            print(f"   - Restaurants found: {len(restaurants)}")
-                        
-                        elif 'hospital' in prompt_lower or 'hospitals' in prompt_lower:
-                            hospitals = extract_elements_by_tag(raw_result, 'amenity', 'hospital')
-                            matched_elements = len(hospitals)
-                            print(f"   - Hospitals found: {len(hospitals)}")
-                        
-                        elif 'park' in prompt_lower or 'parks' in prompt_lower:
-                            parks = extract_elements_by_tag(raw_result, 'leisure', 'park')
-                            if not parks:
-                                parks = extract_elements_by_tag(raw_result, 'amenity', 'park')
-                            matched_elements = len(parks)
-                            print(f"   - Parks found: {len(parks)}")
-                        
+                    # Bind hot values to locals once (LOAD_FAST instead of
+                    # repeated attribute/dict lookups below)
+                    prompt = args.prompt
+                    elements = raw_result.get('elements', [])
+                    element_count = len(elements)
+
+                    # Start the disk write immediately so it overlaps with the
+                    # analysis below; joined before returning
+                    write_future = (
+                        _get_write_executor().submit(
+                            _write_result_file, raw_result, args.output_file, args.pretty)
+                        if args.output_file else None
+                    )
+
+                    if args.json_output:
+                        keyword = _match_intent(prompt)
+                        if keyword is not None:
+                            tag_key, tag_value = INTENT_TABLE[keyword]
+                            matched_elements = len(extract_elements_by_tag(raw_result, tag_key, tag_value))
                         else:
-                            # For general cases, analyze common tags
-                            common_tags = summary['common_tags']
-                            print(f"   - Common tags analysis: {list(common_tags.keys())[:5]}")
                             matched_elements = element_count
+                        if write_future is not None:
+                            _finish_result_write(write_future)
+                        sys.stdout.buffer.write(_dump_result_bytes({
+                            'query': query_result.query_string,
+                            'status': 'ok',
+                            'count': element_count,
+                            'matched': matched_elements,
+                        }) + b'\n')
+                        return
+
+                    # Empty result: skip the whole analysis pipeline rather than
+                    # walking the payload just to print zeros
+                    if element_count == 0:
+                        print(f"{_G['stats']} Query Results: 0 elements found")
+                        print(f"{_G['warn']}  VALIDATION WARNING: No clear matches found for prompt intent")
+                        if write_future is not None and _finish_result_write(write_future):
+                            print(f"{_G['save']} Results saved to: {args.output_file}")
+                        return
+
+                    # Accumulate status lines and flush them in one write instead
+                    # of a print (and GIL/flush round-trip) per line
+                    out = [f"{_G['stats']} Query Results: {element_count} elements found"]
+
+                    # Full per-tag aggregation is O(N); skip it on very large
+                    # responses unless the user asks for it
+                    run_analysis = args.verbose or element_count < 10_000
+                    common_tag_keys = []
+                    if run_analysis:
+                        summary = summarize_result(raw_result)
+                        common_tag_keys = list(summary['common_tags'])[:5]
+                        out += [
+                            f"{_G['chart']} Result Analysis:",
+                            f"   - Total elements: {summary['total_elements']}",
+                            f"   - Element types: {summary['element_types']}",
+                            f"   - Common tags: {common_tag_keys}",
+                            f"   - Has geometry: {summary['has_geometry']}",
+                        ]
+                    else:
+                        out.append("   (Skipping detailed analysis for large response; use --verbose to force)")
+
+                    # Analyze if results match the prompt intent using the
+                    # token index (one tokenize pass + O(1) keyword lookups)
+                    matched_elements = 0
+                    keyword = _match_intent(prompt)
+
+                    if keyword is not None:
+                        tag_key, tag_value = INTENT_TABLE[keyword]
+                        matches = extract_elements_by_tag(raw_result, tag_key, tag_value)
+                        matched_elements = len(matches)
+                        out.append(f"   - {_pluralize(keyword).capitalize()} found: {matched_elements}")
+
+                    else:
+                        # For general cases, analyze common tags
+                        if run_analysis:
+                            out.append(f"   - Common tags analysis: {common_tag_keys}")
+                        matched_elements = element_count
+
+                    out.append(f"   - Elements matching prompt intent: {matched_elements}")
+
+                    # Determine validation status
+                    if matched_elements > 0:
+                        out.append(f"{_G['ok']} VALIDATION SUCCESS: Query results match prompt intent")
+                        out.append(f"   The query found {matched_elements} elements related to '{prompt}'")
+                    else:
+                        out.append(f"{_G['warn']}  VALIDATION WARNING: No clear matches found for prompt intent")
+                        out.append(f"   You may want to refine your prompt or check the results manually")
+
+                    # Join the background save before reporting
+                    if write_future is not None and _finish_result_write(write_future):
+                        out.append(f"{_G['save']} Results saved to: {args.output_file}")
+
+                    print('\n'.join(out))
                         
-                        print(f"   - Elements matching prompt intent: {matched_elements}")
-                        
-                        # Determine validation status
-                        if matched_elements > 0:
-                            print(f"✅ VALIDATION SUCCESS: Query results match prompt intent")
-                            print(f"   The query found {matched_elements} elements related to '{args.prompt}'")
-                        else:
-                            print(f"⚠️  VALIDATION WARNING: No clear matches found for prompt intent")
-                            print(f"   You may want to refine your prompt or check the results manually")
-                        
-                        # Save results if output file specified
-                        if args.output_file:
-                            import json
-                            with open(args.output_file, 'w') as f:
-                                json.dump(raw_result, f, indent=2)
-                            print(f"💾 Results saved to: {args.output_file}")
-                            
-                    except ImportError:
-                        print(f"📊 Found {element_count} elements in response")
-                        print(f"   (Detailed analysis requires additional dependencies)")
-                        
-                        # Save results if output file specified
-                        if args.output_file:
-                            import json
-                            with open(args.output_file, 'w') as f:
-                                json.dump(raw_result, f, indent=2)
-                            print(f"💾 Results saved to: {args.output_file}")
                 else:
-                    print("❌ Query execution failed")
-        
-        elif args.test and not FUNCTIONAL_TESTING_AVAILABLE:
-            print("\n⚠️  Query execution not available. Install dependencies with: uv add pydantic requests")
-        
+                    print(f"{_G['fail']} Query execution failed")
+
         else:
-            # Original behavior - ask for user confirmation
-            try:
-                confirmation = input("Does this query look correct? (y/n): ")
+            # Ask for user confirmation, but only when running interactively;
+            # in pipelines and CI we just print the query and exit
+            if sys.stdin.isatty():
+                try:
+                    confirmation = input("Does this query look correct? (y/n): ")
+                except EOFError:
+                    # Ctrl-D at the prompt means no answer; treat as decline
+                    confirmation = 'n'
                 if confirmation.lower() == 'y':
                     print("Executing query...") # In a real scenario, we would execute the query here
                 else:
                     print("Query execution cancelled.")
-            except EOFError:
-                # This happens when the script is run non-interactively.
-                # We can just print the query and exit.
-                pass
                 
     except OverpassQLError as e:
         print(f"Error generating query: {e}")
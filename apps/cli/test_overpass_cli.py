@@ -0,0 +1,70 @@
+import json
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# The CLI bootstraps its own sys.path, so the tests drive it the way a
+# user would: as a subprocess. Nothing here uses --test, so no network.
+_CLI = Path(__file__).resolve().parent / "overpass_cli.py"
+
+
+def _run_cli(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, str(_CLI), *args],
+        capture_output=True, text=True, timeout=60
+    )
+
+
+class TestOverpassCli(unittest.TestCase):
+    def test_json_output_emits_single_json_line(self) -> None:
+        """--json-output prints exactly one machine-readable JSON line"""
+        proc = _run_cli("Find all cafes in Paris", "--json-output")
+
+        self.assertEqual(proc.returncode, 0)
+        lines = proc.stdout.strip().splitlines()
+        self.assertEqual(len(lines), 1)
+        payload = json.loads(lines[0])
+        self.assertIn("amenity", payload["query"])
+        self.assertIn("Paris", payload["query"])
+
+    def test_prompt_file_builds_one_batched_query(self) -> None:
+        """--prompt-file merges all prompts into a single Overpass request"""
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write("Find all cafes in Paris\nFind all libraries in London\n")
+            prompt_file = f.name
+
+        proc = _run_cli("--prompt-file", prompt_file)
+
+        self.assertEqual(proc.returncode, 0)
+        self.assertIn('area[name="Paris"]', proc.stdout)
+        self.assertIn('area[name="London"]', proc.stdout)
+        self.assertIn('"amenity"="cafe"', proc.stdout)
+        self.assertIn('"amenity"="library"', proc.stdout)
+        # One request: a single union of the per-prompt sets and one output
+        self.assertIn("(.set0; .set1;);", proc.stdout)
+        self.assertEqual(proc.stdout.count("out body;"), 1)
+
+    def test_prompt_file_respects_output_format(self) -> None:
+        """--prompt-file carries --format into the batched query header"""
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write("Find all cafes in Paris\n")
+            prompt_file = f.name
+
+        proc = _run_cli("--prompt-file", prompt_file, "--format", "xml")
+
+        self.assertEqual(proc.returncode, 0)
+        self.assertIn("[out:xml];", proc.stdout)
+        self.assertNotIn("[out:json];", proc.stdout)
+
+    def test_missing_prompt_is_an_error(self) -> None:
+        """Without a prompt or --prompt-file the parser reports an error"""
+        proc = _run_cli()
+
+        self.assertNotEqual(proc.returncode, 0)
+        self.assertIn("a prompt or --prompt-file is required", proc.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
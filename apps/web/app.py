@@ -1,25 +1,466 @@
 #!/usr/bin/env python3
 import streamlit as st
+import hashlib
 import json
-import pandas as pd
-import requests
-from typing import Dict, Any, List, Optional
+import os
+import tempfile
+from collections import Counter
+from itertools import chain, islice
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple, cast
 from overpass_ql_gen.oql_generator.generator import generate_query, OverpassQLError, OutputFormat
-from overpass_ql_gen.testing.overpass_functional_tester import OverpassFunctionalTester
+from overpass_ql_gen.validation.validator import OverpassQuery
+
+if TYPE_CHECKING:
+    import requests
+
+# pandas and requests are imported lazily at their call sites: many sessions
+# never execute a query or render a preview, and deferring them cuts
+# cold-start import time for every Streamlit worker.
+
+# Use orjson's C parser/encoder for large Overpass payloads when available,
+# falling back to the stdlib json module.
+try:
+    import orjson
+
+    def _loads_response(content: bytes) -> Any:
+        return orjson.loads(content)
+
+    def _dumps_pretty(data: Any) -> str:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+
+    def _dumps_compact(data: Any) -> bytes:
+        return orjson.dumps(data)
+except ImportError:
+    def _loads_response(content: bytes) -> Any:
+        return json.loads(content)
+
+    def _dumps_pretty(data: Any) -> str:
+        return json.dumps(data, indent=2)
+
+    def _dumps_compact(data: Any) -> bytes:
+        return json.dumps(data, separators=(',', ':')).encode()
+
+# Optional incremental parser: avoids buffering the whole response body and
+# a fully built DOM at the same time on very large results.
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Decode failures differ per parser; orjson's error subclasses json's
+_JSON_ERRORS: tuple = (json.JSONDecodeError,)
+if ijson is not None:
+    _JSON_ERRORS = _JSON_ERRORS + (ijson.JSONError,)
+
+def _persist_response(response_bytes: bytes) -> str:
+    """Write the full payload to a content-addressed tempfile and return its path.
+
+    Keeping only a small metadata dict in session state caps per-session
+    memory at O(1) instead of O(response size).
+    """
+    digest = hashlib.blake2b(response_bytes, digest_size=16).hexdigest()
+    file_path = os.path.join(tempfile.gettempdir(), f"overpass_{digest}.json")
+    if not os.path.exists(file_path):
+        with open(file_path, 'wb') as f:
+            f.write(response_bytes)
+    return file_path
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _load_response_bytes(path: str) -> bytes:
+    """Read a persisted payload back from disk (cached per content hash).
+
+    The path is content-addressed, so caching on it means the disk read and
+    the re-upload to the browser happen once per unique response rather than
+    on every rerun.
+    """
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@st.cache_data(ttl=3600, max_entries=512, show_spinner=False)
+def _cached_generate(prompt: str, fmt: str) -> OverpassQuery:
+    """Memoized query generation keyed on (prompt, format).
+
+    Repeat prompts across reruns and sessions skip the parse/validate path
+    entirely.
+    """
+    return generate_query(prompt, output_format=cast(OutputFormat, fmt))
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _element_stats(response_bytes: bytes) -> Tuple[Counter, List[Tuple[str, int]], int]:
+    """Single-pass element statistics over a serialized Overpass response.
+
+    One traversal fills both counters instead of separate per-type scans plus
+    a manual tag-count loop; keyed on the serialized bytes so hashing the
+    cache key is cheap.
+    """
+    data = _loads_response(response_bytes)
+    elements = data.get('elements', ())
+    type_counts = Counter(elem.get('type') for elem in elements)
+    # Counter consumes the chained iterable in C: one dict lookup per tag
+    # instead of a Python-level get/set pair
+    tag_counts = Counter(chain.from_iterable(
+        (f"{k}={v}" for k, v in tags.items())
+        for elem in elements if (tags := elem.get('tags'))
+    ))
+    return type_counts, tag_counts.most_common(10), len(elements)
+
+
+# Shared system prompt for all AI summary providers
+_AI_SYSTEM_PROMPT = """You are an expert geospatial data analyst specializing in OpenStreetMap (OSM) and Overpass API query results.
+
+CONTEXT:
+- OpenStreetMap is a collaborative mapping project with crowdsourced geographic data
+- Overpass API is a read-only API that queries OSM data using Overpass QL query language
+- OSM data consists of three element types:
+  * Nodes: Point features with lat/lon coordinates (e.g., POIs, addresses)
+  * Ways: Ordered lists of nodes forming lines or polygons (e.g., roads, buildings)
+  * Relations: Complex features grouping nodes/ways (e.g., multipolygons, route relations)
+
+- OSM uses a tagging system with key=value pairs:
+  * amenity=cafe, shop=supermarket, highway=residential, building=house, etc.
+  * Tags describe real-world features and their attributes
+  * Common keys: name, addr:*, opening_hours, website, phone, etc.
+
+YOUR TASK:
+Analyze the provided Overpass API query results with a geospatial lens:
+1. Identify what real-world features are represented
+2. Assess spatial distribution patterns and density
+3. Evaluate data completeness and quality
+4. Highlight notable or unusual features
+5. Suggest practical applications based on the data characteristics
+
+Provide specific, actionable insights referencing actual feature names and attributes from the data.
+Use geographic terminology appropriately (e.g., clusters, corridors, density, distribution)."""
+
+
+# Prompt templates hoisted to module scope so the hot path renders each
+# one with a single format_map call instead of rebuilding multiline
+# f-strings (the basic template doubles as the AI-failure fallback)
+_BASIC_SUMMARY_TEMPLATE = """\
+## Summary of OSM Data Query Results
+
+**Query**: {query}
+**Location**: {search_area}
+**Total Elements Found**: {total_elements}
+
+### Breakdown by Type:
+- Nodes: {node_count}
+- Ways: {way_count}
+- Relations: {relation_count}
+
+### Geographic Context:
+{geo_context}
+
+### Common Features:
+{top_tags_str}
+
+### Sample Named Features:
+{sample_names_str}
+
+### Analysis:
+This OSM query returned {total_elements} elements in {search_area}.
+The most common features in this dataset are represented by the tags: {top_tag}.
+The data includes {node_count} point features, {way_count} line/polygon features, and {relation_count} complex features."""
+
+_AI_PROMPT_TEMPLATE = """\
+Analyze this OpenStreetMap query result and provide a comprehensive, insightful summary.
+
+Query Information:
+- Original Query: {query}
+- Location: {search_area}
+- Total Elements: {total_elements}
+
+Data Overview:
+- Nodes (points): {node_count}
+- Ways (lines/polygons): {way_count}
+- Relations (complex features): {relation_count}
+{raw_geo_context}
+
+Top 10 Most Common Tags: {top_tags_str}
+
+Sample Named Features: {sample_names_str}
+
+ACTUAL DATA SAMPLE ({sample_size} elements):
+{sample_json}
+
+"""
+
+_ADVANCED_ANALYSIS_INSTRUCTIONS = """Please provide a DETAILED analysis including:
+
+1. **Feature Type Summary**: What specific types of geographic features are present (e.g., restaurants, parks, roads)?
+2. **Spatial Patterns**: Analyze the geographic distribution - are features clustered or dispersed? Any notable patterns?
+3. **Data Quality**: Assess completeness of names, addresses, and other attributes
+4. **Notable Features**: Highlight 3-5 interesting or unique features from the sample data
+5. **Tag Analysis**: What do the OSM tags reveal about the characteristics of these features?
+6. **Use Cases**: Suggest 3-4 specific practical applications for this dataset
+7. **Data Insights**: Any unusual patterns, missing data, or areas for improvement?
+
+Provide specific examples from the actual data sample when making observations.
+"""
+
+_STANDARD_ANALYSIS_INSTRUCTIONS = """Please provide:
+
+1. **Summary**: What type of features were found? Reference specific examples from the data.
+2. **Geographic Distribution**: Analyze the spatial spread and density based on coordinates
+3. **Key Insights**: 2-3 interesting patterns or notable features from the actual data
+4. **Potential Uses**: Practical applications for this dataset
+
+Be specific and reference actual feature names or characteristics from the sample data.
+"""
+
+
+def _hash_api_key(api_key: str) -> str:
+    """Short digest of an API key so the raw key never becomes a cache key."""
+    return hashlib.blake2b(api_key.encode(), digest_size=8).hexdigest()
+
+
+@st.cache_resource(show_spinner=False)
+def _overpass_session() -> "requests.Session":
+    """Pooled HTTP session for Overpass API calls.
+
+    Keep-alive connections and TLS session reuse remove the per-request
+    handshake; one session is shared by all user sessions on this worker.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=4))
+    session.headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    return session
+
+
+# Cached API clients: reuses the HTTPX connection pool and TLS session across
+# summary calls instead of constructing a fresh client per call.
+@st.cache_resource(show_spinner=False)
+def _openai_client(key_hash: str, _api_key: str) -> Any:
+    import openai
+    return openai.OpenAI(api_key=_api_key)
+
+
+@st.cache_resource(show_spinner=False)
+def _gemini_model(key_hash: str, _api_key: str) -> Any:
+    import google.generativeai as genai
+    genai.configure(api_key=_api_key)
+    return genai.GenerativeModel(
+        'gemini-1.5-pro',
+        system_instruction=_AI_SYSTEM_PROMPT
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def _anthropic_client(key_hash: str, _api_key: str) -> Any:
+    import anthropic
+    return anthropic.Anthropic(api_key=_api_key)
+
+
+# Cached AI summary cores: identical (prompt, key) pairs are served from the
+# in-process cache instead of re-paying the HTTPS round-trip and inference.
+# The `_api_key` argument has a leading underscore so Streamlit excludes the
+# raw key from cache hashing; failures raise so errors are never cached.
+@st.cache_data(ttl=86400, max_entries=128, show_spinner=False)
+def _cached_openai_summary(prompt: str, key_hash: str, _api_key: str) -> Optional[str]:
+    client = _openai_client(key_hash, _api_key)
+    response = client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": _AI_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=3000,
+        temperature=0.7
+    )
+    return response.choices[0].message.content
+
+
+@st.cache_data(ttl=86400, max_entries=128, show_spinner=False)
+def _cached_gemini_summary(prompt: str, key_hash: str, _api_key: str) -> Optional[str]:
+    model = _gemini_model(key_hash, _api_key)
+    response = model.generate_content(
+        prompt,
+        generation_config={
+            'max_output_tokens': 3000,
+            'temperature': 0.7,
+        }
+    )
+    return response.text
+
+
+@st.cache_data(ttl=86400, max_entries=128, show_spinner=False)
+def _cached_claude_summary(prompt: str, key_hash: str, _api_key: str) -> Optional[str]:
+    client = _anthropic_client(key_hash, _api_key)
+    response = client.messages.create(
+        model="claude-3-5-sonnet-20241022",
+        max_tokens=3000,
+        temperature=0.7,
+        system=_AI_SYSTEM_PROMPT,
+        messages=[
+            {"role": "user", "content": prompt}
+        ]
+    )
+    return response.content[0].text
+
+
+# AI service wrappers and summary builder (module scope: defined once per
+# process instead of re-created on every rerun)
+def call_openai_api(api_key: str, prompt: str) -> Optional[str]:
+    """Call OpenAI API to generate a summary (cached per prompt/key)"""
+    if not api_key:
+        return None
+    try:
+        return _cached_openai_summary(prompt, _hash_api_key(api_key), api_key)
+    except Exception as e:
+        st.error(f"Error calling OpenAI API: {e}")
+        return None
+
+def call_gemini_api(api_key: str, prompt: str) -> Optional[str]:
+    """Call Google Gemini API to generate a summary (cached per prompt/key)"""
+    if not api_key:
+        return None
+    try:
+        return _cached_gemini_summary(prompt, _hash_api_key(api_key), api_key)
+    except Exception as e:
+        st.error(f"Error calling Gemini API: {e}")
+        return None
+
+def call_claude_api(api_key: str, prompt: str) -> Optional[str]:
+    """Call Anthropic Claude API to generate a summary (cached per prompt/key)"""
+    if not api_key:
+        return None
+    try:
+        return _cached_claude_summary(prompt, _hash_api_key(api_key), api_key)
+    except Exception as e:
+        st.error(f"Error calling Claude API: {e}")
+        return None
+
+# Create a function to generate AI summary of the JSON response
+def generate_response_summary(response_data: Dict[str, Any], query_info: str = "",
+                            service_type: str = "basic", api_key: str = "",
+                            response_bytes: Optional[bytes] = None) -> str:
+    """
+    Generate an AI summary of the Overpass API response using selected service
+    """
+    elements = response_data.get('elements', [])
+
+    if not elements:
+        return "No elements found in the response."
+
+    # Prepare basic statistics for use in both basic and AI summaries;
+    # a cached single pass replaces three per-type scans plus a tag loop
+    if response_bytes is None:
+        response_bytes = _dumps_compact(response_data)
+    type_counts, top_tags, total_elements = _element_stats(response_bytes)
+    node_count = type_counts['node']
+    way_count = type_counts['way']
+    relation_count = type_counts['relation']
+    top_tags_str = ", ".join([f"{tag} ({count})" for tag, count in top_tags])
+
+    # Get the search area
+    search_area = st.session_state.get('query_result', {}).search_area or 'unknown location'
+
+    # Extract geographic context (bounding box, coordinate ranges)
+    geo_context = ""
+    lats = [elem.get('lat') for elem in elements if elem.get('lat')]
+    lons = [elem.get('lon') for elem in elements if elem.get('lon')]
+
+    if lats and lons:
+        min_lat, max_lat = min(lats), max(lats)
+        min_lon, max_lon = min(lons), max(lons)
+        lat_range = max_lat - min_lat
+        lon_range = max_lon - min_lon
+        geo_context = f"\n- Geographic Span: {lat_range:.4f}° latitude x {lon_range:.4f}° longitude"
+        geo_context += f"\n- Bounding Box: ({min_lat:.4f}, {min_lon:.4f}) to ({max_lat:.4f}, {max_lon:.4f})"
+
+    # Extract sample element names for context
+    sample_names = []
+    for elem in elements[:20]:
+        if elem.get('tags', {}).get('name'):
+            sample_names.append(elem['tags']['name'])
+    sample_names_str = ", ".join(sample_names[:10]) if sample_names else "No named features"
+
+    # Shared field dict: rendered once for the basic path and reused
+    # verbatim if an AI call fails and we fall back
+    summary_fields = {
+        'query': query_info or 'OSM Query Results',
+        'search_area': search_area,
+        'total_elements': total_elements,
+        'node_count': node_count,
+        'way_count': way_count,
+        'relation_count': relation_count,
+        'geo_context': geo_context if geo_context else "No coordinate data available",
+        'top_tags_str': top_tags_str,
+        'sample_names_str': sample_names_str,
+        'top_tag': top_tags_str.split(',')[0] if top_tags_str else 'no specific tags',
+    }
+
+    # If using basic summary, return the local analysis
+    if service_type == "basic":
+        return _BASIC_SUMMARY_TEMPLATE.format_map(summary_fields)
+
+    # For AI services, create a detailed prompt with sample elements
+    else:
+        # Get sample elements with full details - adjust based on detail level
+        sample_size = min(15, total_elements)
+        if summary_detail_level >= 4:
+            sample_size = min(25, total_elements)
+        elif summary_detail_level <= 2:
+            sample_size = min(10, total_elements)
+
+        sample_elements = elements[:sample_size]
+        sample_json = json.dumps(sample_elements, indent=2)
+
+        # Build comprehensive prompt with actual data
+        base_prompt = _AI_PROMPT_TEMPLATE.format_map({
+            **summary_fields,
+            'raw_geo_context': geo_context,
+            'sample_size': sample_size,
+            'sample_json': sample_json,
+        })
+        # Add analysis instructions based on detail level and advanced analysis setting
+        if enable_advanced_analysis:
+            base_prompt += _ADVANCED_ANALYSIS_INSTRUCTIONS
+        else:
+            base_prompt += _STANDARD_ANALYSIS_INSTRUCTIONS
+
+        if summary_detail_level >= 4:
+            base_prompt += "\n\nProvide a COMPREHENSIVE and DETAILED analysis with rich insights."
+        elif summary_detail_level <= 2:
+            base_prompt += "\n\nProvide a CONCISE summary focused on the most important insights."
+
+        # Call the appropriate API based on service type
+        if service_type == "openai" and api_key:
+            result = call_openai_api(api_key, base_prompt)
+            if result:
+                return f"## OpenAI-Generated Summary\n\n{result}"
+
+        elif service_type == "gemini" and api_key:
+            result = call_gemini_api(api_key, base_prompt)
+            if result:
+                return f"## Gemini-Generated Summary\n\n{result}"
+
+        elif service_type == "claude" and api_key:
+            result = call_claude_api(api_key, base_prompt)
+            if result:
+                return f"## Claude-Generated Summary\n\n{result}"
+
+        # If API call failed, fall back to the already-prepared basic summary
+        st.warning(f"AI service request failed. Using basic summary instead.")
+        return _BASIC_SUMMARY_TEMPLATE.format_map(summary_fields)
 
 # Helper functions for UI elements
-def create_json_download_button(response_data: Dict, key_suffix: str = ""):
-    """Create a download button for JSON response"""
-    json_str = json.dumps(response_data, indent=2)
+def create_json_download_button(meta: Dict, key_suffix: str = "") -> None:
+    """Create a download button for the persisted JSON response"""
     st.download_button(
         label="Download JSON Response",
-        data=json_str,
+        data=_load_response_bytes(meta['path']),
         file_name="overpass_response.json",
         mime="application/json",
         key=f"download_response_{key_suffix}"
     )
 
-def create_summary_download_button(summary_text: str, key_suffix: str = ""):
+def create_summary_download_button(summary_text: str, key_suffix: str = "") -> None:
     """Create a download button for summary"""
     st.download_button(
         label="Download Summary",
@@ -29,20 +470,78 @@ def create_summary_download_button(summary_text: str, key_suffix: str = ""):
         key=f"download_summary_{key_suffix}"
     )
 
-def create_element_preview(elements: List[Dict]):
-    """Create a preview table for the first few elements"""
-    if elements:
+# Example prompts shown when the input is empty; a module-level tuple is
+# shared across reruns instead of rebuilding the list each time
+EXAMPLES = (
+    "Find all cafes in Paris",
+    "Show me bicycle parking in Berlin",
+    "Find all libraries in New York",
+    "Show me bus stops in London",
+    "Find all restaurants in Tokyo with outdoor seating",
+    "Show me parks in Rome",
+)
+
+def _fragment(func: Callable[[], None]) -> Callable[[], None]:
+    """Isolate a panel with st.fragment when available (Streamlit >= 1.33).
+
+    Button clicks inside a fragment rerun only the fragment, so editing
+    the prompt no longer re-renders the response preview or AI summary.
+    Falls back to plain whole-script reruns on older Streamlit.
+    """
+    fragment = getattr(st, "fragment", None)
+    return fragment(func) if fragment is not None else func
+
+
+# Above this payload size the raw JSON preview is disabled; the download
+# button streams from disk so huge responses never transit the websocket
+_RAW_PREVIEW_SIZE_LIMIT = 25 * 1024 * 1024
+
+
+def create_json_preview_expander(preview: List[Dict], key_suffix: str = "") -> None:
+    """Expander whose st.json render is gated behind an explicit click.
+
+    Even a collapsed expander serializes its st.json payload to the
+    frontend on every rerun; gating keeps reruns cheap until the user
+    actually asks to see the JSON.
+    """
+    state_key = f"show_json_{key_suffix}"
+    with st.expander("View Response Preview (first 5 elements)", expanded=False):
+        if st.session_state.get(state_key):
+            st.json(preview)
+        elif st.button("Render JSON preview", key=f"render_json_{key_suffix}"):
+            st.session_state[state_key] = True
+            st.rerun()
+
+
+def create_element_preview(elements: Iterable[Dict[str, Any]]) -> None:
+    """Create a preview table for the first few elements.
+
+    Accepts any iterable (list or streaming iterator) and touches at
+    most the first five items via islice.
+    """
+    first5 = list(islice(iter(elements), 5))
+    if first5:
+        import pandas as pd
+
         with st.expander("Preview First 5 Elements", expanded=True):
-            preview_data = []
-            for i, elem in enumerate(elements[:5]):  # Show first 5 elements
-                preview_data.append({
-                    'id': elem.get('id', 'N/A'),
-                    'type': elem.get('type', 'N/A'),
-                    'tags_count': len(elem.get('tags', {})),
-                    'first_tag': list(elem.get('tags', {}).keys())[0] if elem.get('tags') else 'N/A'
-                })
-            
-            df = pd.DataFrame(preview_data)
+            # Vectorized construction; first_tag peeks via an iterator instead
+            # of materializing the full tag key list
+            raw = pd.json_normalize(first5, max_level=0)
+            tags = raw['tags'] if 'tags' in raw else pd.Series([{}] * len(raw))
+            df = pd.DataFrame({
+                'id': pd.to_numeric(raw.get('id'), errors='coerce'),
+                'type': raw.get('type', 'N/A'),
+                'tags_count': tags.map(lambda t: len(t) if isinstance(t, dict) else 0),
+                'first_tag': tags.map(lambda t: next(iter(t), 'N/A') if isinstance(t, dict) else 'N/A'),
+            })
+            # Explicit dtypes let Streamlit's Arrow conversion skip the
+            # per-column type-inference pass
+            df = df.astype({
+                'id': 'Int64',
+                'type': 'category',
+                'tags_count': 'Int32',
+                'first_tag': 'string',
+            })
             st.dataframe(df, use_container_width=True)
 
 # Set page configuration
@@ -118,80 +617,63 @@ if 'selected_example' not in st.session_state:
     st.session_state['selected_example'] = None
 
 # Use session state value if an example was selected
-if st.session_state['selected_example']:
-    user_input = st.text_input(
-        "Natural language request:",
-        value=st.session_state['selected_example'],
-        placeholder="e.g., Find all cafes in Paris, Show me bicycle parking in Berlin...",
-        help="Describe what OpenStreetMap features you want to query"
-    )
-    # Clear the selected example after displaying
-    st.session_state['selected_example'] = None
-else:
-    user_input = st.text_input(
-        "Natural language request:",
-        placeholder="e.g., Find all cafes in Paris, Show me bicycle parking in Berlin...",
-        help="Describe what OpenStreetMap features you want to query"
+example_prompt = st.session_state['selected_example']
+
+# The form batches the text input and format selection into a single
+# submit, so the app reruns generation once per click instead of on
+# every widget interaction
+with st.form("query_form", clear_on_submit=False):
+    if example_prompt:
+        user_input = st.text_input(
+            "Natural language request:",
+            value=example_prompt,
+            placeholder="e.g., Find all cafes in Paris, Show me bicycle parking in Berlin...",
+            help="Describe what OpenStreetMap features you want to query"
+        )
+        # Clear the selected example after displaying
+        st.session_state['selected_example'] = None
+    else:
+        user_input = st.text_input(
+            "Natural language request:",
+            placeholder="e.g., Find all cafes in Paris, Show me bicycle parking in Berlin...",
+            help="Describe what OpenStreetMap features you want to query"
+        )
+
+    output_format = st.selectbox(
+        "Output format:",
+        options=["json", "xml", "geojson"],
+        index=0,
+        help="Choose the output format for the Overpass API"
     )
 
+    generate_clicked = st.form_submit_button("Generate", type="primary")
+
 # Example requests - show only if no user input
 if not user_input:
     st.markdown("**Or try an example:**")
-    examples = [
-        "Find all cafes in Paris",
-        "Show me bicycle parking in Berlin",
-        "Find all libraries in New York",
-        "Show me bus stops in London",
-        "Find all restaurants in Tokyo with outdoor seating",
-        "Show me parks in Rome"
-    ]
-
     cols = st.columns(3)
-    for idx, example in enumerate(examples):
+    for idx, example in enumerate(EXAMPLES):
         with cols[idx % 3]:
             if st.button(example, key=f"example_{idx}", use_container_width=True):
                 st.session_state['selected_example'] = example
                 st.rerun()
 
-# Output format selection
-output_format = st.selectbox(
-    "Output format:",
-    options=["json", "xml", "geojson"],
-    index=0,
-    help="Choose the output format for the Overpass API"
-)
-
-# Auto-generate query when user enters text
-if user_input and len(user_input.strip()) >= 5:
-    # Check if we need to regenerate (input or format changed)
-    should_generate = (
-        'last_user_input' not in st.session_state or
-        st.session_state['last_user_input'] != user_input or
-        'last_output_format' not in st.session_state or
-        st.session_state['last_output_format'] != output_format
-    )
-
-    if should_generate:
-        try:
-            with st.spinner("Generating Overpass QL query..."):
-                # Explicitly cast to the expected literal type
-                from typing import cast
-                from overpass_ql_gen.oql_generator.generator import OutputFormat
-                format_literal = cast(OutputFormat, output_format)
-                query_result = generate_query(user_input, output_format=format_literal)
-
-                # Store query result and inputs in session state
-                st.session_state['query_result'] = query_result
-                st.session_state['last_user_input'] = user_input
-                st.session_state['last_output_format'] = output_format
-
-            st.success("Query generated successfully!")
-
-        except OverpassQLError as e:
-            st.error(f"Error generating query: {e}")
-        except Exception as e:
-            st.error(f"Unexpected error: {e}")
-elif user_input and len(user_input.strip()) < 5:
+# Generate on form submit (or when an example button pre-filled the
+# prompt); st.cache_data makes repeated (prompt, format) pairs a
+# memoized lookup, so no manual regeneration guard is needed
+if (generate_clicked or example_prompt) and user_input and len(user_input.strip()) >= 5:
+    try:
+        with st.spinner("Generating Overpass QL query..."):
+            query_result = _cached_generate(user_input, output_format)
+            st.session_state['query_result'] = query_result
+
+        st.success("Query generated successfully!")
+
+    except OverpassQLError as e:
+        st.error(f"Error generating query: {e}")
+    except Exception as e:
+        st.error(f"Unexpected error: {e}")
+elif (generate_clicked or example_prompt) and user_input and len(user_input.strip()) < 5:
     st.warning("Please enter at least 5 characters to generate a query.")
 
 # Display query if it exists in session state
@@ -202,24 +684,17 @@ if 'query_result' in st.session_state:
     st.header("Generated Overpass QL Query")
     st.code(query_result.query_string, language="overpassql")
 
-    # Action buttons in columns
-    col_copy, col_execute = st.columns([1, 1])
-
-    with col_copy:
-        if st.button("📋 Copy Query", key="copy_query", use_container_width=True):
-            st.write("Query copied to clipboard!")
-            # Using st.code with a hidden container to enable copying
-            st.components.v1.html(
-                f"""
-                <script>
-                navigator.clipboard.writeText(`{query_result.query_string.replace('`', '\\`')}`);
-                </script>
-                """,
-                height=0
-            )
-
-    with col_execute:
-        execute_clicked = st.button("▶️ Execute Query", key="execute_query", type="secondary", use_container_width=True)
+    if st.button("📋 Copy Query", key="copy_query", use_container_width=True):
+        st.write("Query copied to clipboard!")
+        # Using st.code with a hidden container to enable copying
+        st.components.v1.html(
+            f"""
+            <script>
+            navigator.clipboard.writeText(`{query_result.query_string.replace('`', '\\`')}`);
+            </script>
+            """,
+            height=0
+        )
 
     # Additional info
     st.info(f"""
@@ -230,431 +705,119 @@ if 'query_result' in st.session_state:
     - Elements: `{query_result.elements}`
     """)
 
-# Add section for executing query and displaying JSON response
-if 'query_result' in st.session_state and 'execute_clicked' in locals() and execute_clicked:
-    with st.spinner("Executing query against Overpass API..."):
-        try:
-            # Get the generated query string
-            query_string = st.session_state['query_result'].query_string
-
-            # Execute the query using direct API call to avoid rate limiting issues
-            response = requests.post(
-                'https://overpass-api.de/api/interpreter',
-                data=query_string,
-                headers={'Content-Type': 'application/x-www-form-urlencoded'},
-                timeout=60
-            )
-            response.raise_for_status()
-            result = response.json()
-
-            # Store the response in session state
-            st.session_state['api_response'] = result
-
-            # Display success message and response
-            st.success("Query executed successfully!")
-
-            # Show response statistics
-            elements = result.get('elements', [])
-            st.info(f"**Response Statistics:** {len(elements)} elements returned")
-
-            # Display JSON response in an expander
-            with st.expander("View Raw JSON Response", expanded=False):
-                st.json(result)
-
-            # Show a preview of the first few elements in a table
-            create_element_preview(elements)
-
-            # Add download button for JSON response
-            create_json_download_button(result, "new")
-
-        except requests.exceptions.HTTPError as e:
-            st.error(f"HTTP Error executing query: {e}. Status code: {response.status_code}")
-            st.error(f"Response text: {response.text[:500]}...")  # First 500 chars
-        except requests.exceptions.Timeout:
-            st.error("Request timed out. The query might be too complex for the Overpass API.")
-        except requests.exceptions.RequestException as e:
-            st.error(f"Network error executing query: {e}")
-        except json.JSONDecodeError:
-            st.error("Invalid JSON response from the Overpass API.")
-            st.error(f"Response text: {response.text[:500]}...")  # First 500 chars
-        except Exception as e:
-            st.error(f"Unexpected error executing query: {e}")
-            import traceback
-            st.error(f"Traceback: {traceback.format_exc()}")
-
-# Display stored response if available
-if 'api_response' in st.session_state:
-    st.subheader("Latest API Response")
-    response = st.session_state['api_response']
-    elements = response.get('elements', [])
-    st.info(f"**Response Statistics:** {len(elements)} elements returned")
-
-    with st.expander("View Raw JSON Response", expanded=False):
-        st.json(response)
-
-    # Show a preview of the first few elements in a table
-    create_element_preview(elements)
-
-    # Add download button for JSON response
-    create_json_download_button(response, "existing")
-
-# AI Summary section - only show if API response exists
-if 'api_response' in st.session_state:
-    st.header("AI-Powered Summary")
-
-    # Create functions to interact with different AI services
-    def call_openai_api(api_key: str, prompt: str) -> Optional[str]:
-        """Call OpenAI API to generate a summary"""
-        if not api_key:
-            return None
-
-        try:
-            import openai
-            client = openai.OpenAI(api_key=api_key)
-
-            system_prompt = """You are an expert geospatial data analyst specializing in OpenStreetMap (OSM) and Overpass API query results.
-
-CONTEXT:
-- OpenStreetMap is a collaborative mapping project with crowdsourced geographic data
-- Overpass API is a read-only API that queries OSM data using Overpass QL query language
-- OSM data consists of three element types:
-  * Nodes: Point features with lat/lon coordinates (e.g., POIs, addresses)
-  * Ways: Ordered lists of nodes forming lines or polygons (e.g., roads, buildings)
-  * Relations: Complex features grouping nodes/ways (e.g., multipolygons, route relations)
-
-- OSM uses a tagging system with key=value pairs:
-  * amenity=cafe, shop=supermarket, highway=residential, building=house, etc.
-  * Tags describe real-world features and their attributes
-  * Common keys: name, addr:*, opening_hours, website, phone, etc.
-
-YOUR TASK:
-Analyze the provided Overpass API query results with a geospatial lens:
-1. Identify what real-world features are represented
-2. Assess spatial distribution patterns and density
-3. Evaluate data completeness and quality
-4. Highlight notable or unusual features
-5. Suggest practical applications based on the data characteristics
-
-Provide specific, actionable insights referencing actual feature names and attributes from the data.
-Use geographic terminology appropriately (e.g., clusters, corridors, density, distribution)."""
-
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=3000,
-                temperature=0.7
-            )
-
-            return response.choices[0].message.content
-        except Exception as e:
-            st.error(f"Error calling OpenAI API: {e}")
-            return None
-
-    def call_gemini_api(api_key: str, prompt: str) -> Optional[str]:
-        """Call Google Gemini API to generate a summary"""
-        if not api_key:
-            return None
-
-        try:
-            import google.generativeai as genai
-
-            system_prompt = """You are an expert geospatial data analyst specializing in OpenStreetMap (OSM) and Overpass API query results.
-
-CONTEXT:
-- OpenStreetMap is a collaborative mapping project with crowdsourced geographic data
-- Overpass API is a read-only API that queries OSM data using Overpass QL query language
-- OSM data consists of three element types:
-  * Nodes: Point features with lat/lon coordinates (e.g., POIs, addresses)
-  * Ways: Ordered lists of nodes forming lines or polygons (e.g., roads, buildings)
-  * Relations: Complex features grouping nodes/ways (e.g., multipolygons, route relations)
-
-- OSM uses a tagging system with key=value pairs:
-  * amenity=cafe, shop=supermarket, highway=residential, building=house, etc.
-  * Tags describe real-world features and their attributes
-  * Common keys: name, addr:*, opening_hours, website, phone, etc.
-
-YOUR TASK:
-Analyze the provided Overpass API query results with a geospatial lens:
-1. Identify what real-world features are represented
-2. Assess spatial distribution patterns and density
-3. Evaluate data completeness and quality
-4. Highlight notable or unusual features
-5. Suggest practical applications based on the data characteristics
-
-Provide specific, actionable insights referencing actual feature names and attributes from the data.
-Use geographic terminology appropriately (e.g., clusters, corridors, density, distribution)."""
-
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel(
-                'gemini-1.5-pro',
-                system_instruction=system_prompt
-            )
-
-            response = model.generate_content(
-                prompt,
-                generation_config={
-                    'max_output_tokens': 3000,
-                    'temperature': 0.7,
-                }
-            )
-            return response.text
-        except Exception as e:
-            st.error(f"Error calling Gemini API: {e}")
-            return None
-
-    def call_claude_api(api_key: str, prompt: str) -> Optional[str]:
-        """Call Anthropic Claude API to generate a summary"""
-        if not api_key:
-            return None
-
-        try:
-            import anthropic
-
-            client = anthropic.Anthropic(api_key=api_key)
-
-            system_prompt = """You are an expert geospatial data analyst specializing in OpenStreetMap (OSM) and Overpass API query results.
-
-CONTEXT:
-- OpenStreetMap is a collaborative mapping project with crowdsourced geographic data
-- Overpass API is a read-only API that queries OSM data using Overpass QL query language
-- OSM data consists of three element types:
-  * Nodes: Point features with lat/lon coordinates (e.g., POIs, addresses)
-  * Ways: Ordered lists of nodes forming lines or polygons (e.g., roads, buildings)
-  * Relations: Complex features grouping nodes/ways (e.g., multipolygons, route relations)
-
-- OSM uses a tagging system with key=value pairs:
-  * amenity=cafe, shop=supermarket, highway=residential, building=house, etc.
-  * Tags describe real-world features and their attributes
-  * Common keys: name, addr:*, opening_hours, website, phone, etc.
-
-YOUR TASK:
-Analyze the provided Overpass API query results with a geospatial lens:
-1. Identify what real-world features are represented
-2. Assess spatial distribution patterns and density
-3. Evaluate data completeness and quality
-4. Highlight notable or unusual features
-5. Suggest practical applications based on the data characteristics
-
-Provide specific, actionable insights referencing actual feature names and attributes from the data.
-Use geographic terminology appropriately (e.g., clusters, corridors, density, distribution)."""
-
-            response = client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=3000,
-                temperature=0.7,
-                system=system_prompt,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+# Execute-and-display panel: a fragment, so clicking Execute (or any
+# button inside, like the JSON preview) reruns only this block
+@_fragment
+def _response_panel() -> None:
+    if 'query_result' not in st.session_state:
+        return
+
+    execute_clicked = st.button("▶️ Execute Query", key="execute_query", type="secondary")
+
+    if execute_clicked:
+        with st.spinner("Executing query against Overpass API..."):
+            _execute_current_query()
+
+    # Display stored response if available (covers both the rerun right
+    # after an execution and later reruns)
+    if 'api_response_meta' in st.session_state:
+        st.subheader("Latest API Response")
+        meta = st.session_state['api_response_meta']
+        st.info(f"**Response Statistics:** {meta['n']} elements returned")
+
+        if meta.get('size', 0) > _RAW_PREVIEW_SIZE_LIMIT:
+            st.warning(
+                f"Response is {meta['size'] / 1e6:.1f} MB — raw preview disabled, "
+                "use the download button to inspect it."
             )
-
-            return response.content[0].text
-        except Exception as e:
-            st.error(f"Error calling Claude API: {e}")
-            return None
-
-    # Create a function to generate AI summary of the JSON response
-    def generate_response_summary(response_data: Dict[str, Any], query_info: str = "",
-                                service_type: str = "basic", api_key: str = "") -> str:
-        """
-        Generate an AI summary of the Overpass API response using selected service
-        """
-        elements = response_data.get('elements', [])
-
-        if not elements:
-            return "No elements found in the response."
-
-        # Prepare basic statistics for use in both basic and AI summaries
-        total_elements = len(elements)
-
-        # Count element types
-        node_count = sum(1 for elem in elements if elem.get('type') == 'node')
-        way_count = sum(1 for elem in elements if elem.get('type') == 'way')
-        relation_count = sum(1 for elem in elements if elem.get('type') == 'relation')
-
-        # Get common tags
-        tag_counts = {}
-        for elem in elements:
-            tags = elem.get('tags', {})
-            for key, value in tags.items():
-                tag_key = f"{key}={value}"
-                tag_counts[tag_key] = tag_counts.get(tag_key, 0) + 1
-
-        # Get top tags
-        sorted_tags = sorted(tag_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-        top_tags_str = ", ".join([f"{tag} ({count})" for tag, count in sorted_tags])
-
-        # Get the search area
-        search_area = st.session_state.get('query_result', {}).search_area or 'unknown location'
-
-        # Extract geographic context (bounding box, coordinate ranges)
-        geo_context = ""
-        lats = [elem.get('lat') for elem in elements if elem.get('lat')]
-        lons = [elem.get('lon') for elem in elements if elem.get('lon')]
-
-        if lats and lons:
-            min_lat, max_lat = min(lats), max(lats)
-            min_lon, max_lon = min(lons), max(lons)
-            lat_range = max_lat - min_lat
-            lon_range = max_lon - min_lon
-            geo_context = f"\n- Geographic Span: {lat_range:.4f}° latitude x {lon_range:.4f}° longitude"
-            geo_context += f"\n- Bounding Box: ({min_lat:.4f}, {min_lon:.4f}) to ({max_lat:.4f}, {max_lon:.4f})"
-
-        # Extract sample element names for context
-        sample_names = []
-        for elem in elements[:20]:
-            if elem.get('tags', {}).get('name'):
-                sample_names.append(elem['tags']['name'])
-        sample_names_str = ", ".join(sample_names[:10]) if sample_names else "No named features"
-
-        # If using basic summary, return the local analysis
-        if service_type == "basic":
-            summary = f"""
-## Summary of OSM Data Query Results
-
-**Query**: {query_info or 'OSM Query Results'}
-**Location**: {search_area}
-**Total Elements Found**: {total_elements}
-
-### Breakdown by Type:
-- Nodes: {node_count}
-- Ways: {way_count}
-- Relations: {relation_count}
-
-### Geographic Context:
-{geo_context if geo_context else "No coordinate data available"}
-
-### Common Features:
-{top_tags_str}
-
-### Sample Named Features:
-{sample_names_str}
-
-### Analysis:
-This OSM query returned {total_elements} elements in {search_area}.
-The most common features in this dataset are represented by the tags: {top_tags_str.split(',')[0] if top_tags_str else 'no specific tags'}.
-The data includes {node_count} point features, {way_count} line/polygon features, and {relation_count} complex features.
-"""
-            return summary.strip()
-
-        # For AI services, create a detailed prompt with sample elements
         else:
-            # Get sample elements with full details - adjust based on detail level
-            sample_size = min(15, total_elements)
-            if summary_detail_level >= 4:
-                sample_size = min(25, total_elements)
-            elif summary_detail_level <= 2:
-                sample_size = min(10, total_elements)
-
-            sample_elements = elements[:sample_size]
-            sample_json = json.dumps(sample_elements, indent=2)
-
-            # Build comprehensive prompt with actual data
-            base_prompt = f"""Analyze this OpenStreetMap query result and provide a comprehensive, insightful summary.
-
-Query Information:
-- Original Query: {query_info or 'OSM Query Results'}
-- Location: {search_area}
-- Total Elements: {total_elements}
-
-Data Overview:
-- Nodes (points): {node_count}
-- Ways (lines/polygons): {way_count}
-- Relations (complex features): {relation_count}
-{geo_context}
-
-Top 10 Most Common Tags: {top_tags_str}
-
-Sample Named Features: {sample_names_str}
-
-ACTUAL DATA SAMPLE ({sample_size} elements):
-{sample_json}
-
-"""
-            # Add analysis instructions based on detail level and advanced analysis setting
-            if enable_advanced_analysis:
-                base_prompt += """Please provide a DETAILED analysis including:
-
-1. **Feature Type Summary**: What specific types of geographic features are present (e.g., restaurants, parks, roads)?
-2. **Spatial Patterns**: Analyze the geographic distribution - are features clustered or dispersed? Any notable patterns?
-3. **Data Quality**: Assess completeness of names, addresses, and other attributes
-4. **Notable Features**: Highlight 3-5 interesting or unique features from the sample data
-5. **Tag Analysis**: What do the OSM tags reveal about the characteristics of these features?
-6. **Use Cases**: Suggest 3-4 specific practical applications for this dataset
-7. **Data Insights**: Any unusual patterns, missing data, or areas for improvement?
-
-Provide specific examples from the actual data sample when making observations.
-"""
-            else:
-                base_prompt += """Please provide:
-
-1. **Summary**: What type of features were found? Reference specific examples from the data.
-2. **Geographic Distribution**: Analyze the spatial spread and density based on coordinates
-3. **Key Insights**: 2-3 interesting patterns or notable features from the actual data
-4. **Potential Uses**: Practical applications for this dataset
-
-Be specific and reference actual feature names or characteristics from the sample data.
-"""
-
-            if summary_detail_level >= 4:
-                base_prompt += "\n\nProvide a COMPREHENSIVE and DETAILED analysis with rich insights."
-            elif summary_detail_level <= 2:
-                base_prompt += "\n\nProvide a CONCISE summary focused on the most important insights."
-
-            # Call the appropriate API based on service type
-            if service_type == "openai" and api_key:
-                result = call_openai_api(api_key, base_prompt)
-                if result:
-                    return f"## OpenAI-Generated Summary\n\n{result}"
-
-            elif service_type == "gemini" and api_key:
-                result = call_gemini_api(api_key, base_prompt)
-                if result:
-                    return f"## Gemini-Generated Summary\n\n{result}"
-
-            elif service_type == "claude" and api_key:
-                result = call_claude_api(api_key, base_prompt)
-                if result:
-                    return f"## Claude-Generated Summary\n\n{result}"
-
-            # If API call failed, fall back to basic summary
-            st.warning(f"AI service request failed. Using basic summary instead.")
-            summary = f"""
-## Summary of OSM Data Query Results
-
-**Query**: {query_info or 'OSM Query Results'}
-**Location**: {search_area}
-**Total Elements Found**: {total_elements}
-
-### Breakdown by Type:
-- Nodes: {node_count}
-- Ways: {way_count}
-- Relations: {relation_count}
-
-### Geographic Context:
-{geo_context if geo_context else "No coordinate data available"}
-
-### Common Features:
-{top_tags_str}
-
-### Sample Named Features:
-{sample_names_str}
+            create_json_preview_expander(meta['preview'], "main")
+
+        # Show a preview of the first few elements in a table
+        create_element_preview(meta['preview'])
+
+        # Add download button for JSON response
+        create_json_download_button(meta, "main")
+
+
+def _execute_current_query() -> None:
+    """Run the generated query against the Overpass API and store metadata."""
+    try:
+        import requests
+
+        # Get the generated query string
+        query_string = st.session_state['query_result'].query_string
+
+        # Execute the query using direct API call to avoid rate limiting issues
+        response = _overpass_session().post(
+            'https://overpass-api.de/api/interpreter',
+            data=query_string,
+            timeout=60,
+            stream=True
+        )
+        response.raise_for_status()
+        if ijson is not None:
+            # Stream the body instead of materializing the raw bytes and
+            # a parsed DOM at the same time; decode_content unwraps the
+            # gzip layer urllib3 leaves on the raw stream. kvitems keeps
+            # every top-level key (version, osm3s, remark, ...), not
+            # just elements
+            response.raw.decode_content = True
+            result = dict(ijson.kvitems(response.raw, ''))
+        else:
+            result = _loads_response(response.content)
+
+        # Persist the full payload to disk and keep only a compact
+        # metadata dict (count + preview) in session state
+        elements = result.get('elements', [])
+        response_bytes = _dumps_compact(result)
+        meta = {
+            'path': _persist_response(response_bytes),
+            'n': len(elements),
+            'size': len(response_bytes),
+            'preview': list(islice(iter(elements), 5)),
+        }
+        st.session_state['api_response_meta'] = meta
+
+        # Display success message; the stored-response section of the
+        # panel renders the preview and download button exactly once
+        st.success("Query executed successfully!")
+
+    except requests.exceptions.HTTPError as e:
+        st.error(f"HTTP Error executing query: {e}. Status code: {response.status_code}")
+        st.error(f"Response text: {response.text[:500]}...")  # First 500 chars
+    except requests.exceptions.Timeout:
+        st.error("Request timed out. The query might be too complex for the Overpass API.")
+    except requests.exceptions.RequestException as e:
+        st.error(f"Network error executing query: {e}")
+    except _JSON_ERRORS:
+        st.error("Invalid JSON response from the Overpass API.")
+        st.error(f"Response text: {response.text[:500]}...")  # First 500 chars
+    except Exception as e:
+        st.error(f"Unexpected error executing query: {e}")
+        import traceback
+        st.error(f"Traceback: {traceback.format_exc()}")
+
+
+_response_panel()
+
+
+# AI Summary panel: also a fragment so generating a summary does not
+# rerun the rest of the script
+@_fragment
+def _ai_summary_panel() -> None:
+    if 'api_response_meta' not in st.session_state:
+        return
 
-### Analysis:
-This OSM query returned {total_elements} elements in {search_area}.
-The most common features in this dataset are represented by the tags: {top_tags_str.split(',')[0] if top_tags_str else 'no specific tags'}.
-The data includes {node_count} point features, {way_count} line/polygon features, and {relation_count} complex features.
-"""
-            return summary.strip()
+    st.header("AI-Powered Summary")
 
     # Button to generate AI summary
     if st.button("Generate AI Summary", type="primary"):
         with st.spinner("Analyzing the response with AI..."):
             try:
-                response_data = st.session_state['api_response']
+                meta = st.session_state['api_response_meta']
+                response_bytes = _load_response_bytes(meta['path'])
+                response_data = _loads_response(response_bytes)
                 query_info = st.session_state.get('query_result', {}).query_string or ""
 
                 # Determine which service to use based on sidebar selection
@@ -676,7 +839,8 @@ The data includes {node_count} point features, {way_count} line/polygon features
                 else:
                     api_key = ""  # No API key needed for basic summary
 
-                summary = generate_response_summary(response_data, query_info, service_type, api_key)
+                summary = generate_response_summary(response_data, query_info, service_type, api_key,
+                                                    response_bytes=response_bytes)
 
                 # Store the summary in session state
                 st.session_state['ai_summary'] = summary
@@ -701,6 +865,9 @@ The data includes {node_count} point features, {way_count} line/polygon features
         # Add download button for the summary
         create_summary_download_button(st.session_state['ai_summary'], "existing")
 
+
+_ai_summary_panel()
+
 # Add some information about Overpass QL
 with st.expander("About Overpass QL"):
     st.markdown("""
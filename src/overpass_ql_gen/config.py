@@ -96,6 +96,21 @@ out body;
 >;
 out skel qt;"""
 
+# Split header/footer variant of the template above: the generator streams
+# body lines between these two, avoiding an intermediate joined body string
+OVERPASS_QUERY_HEADER_TEMPLATE = """// Generated by Overpass QL Generator
+// Prompt: {prompt}
+
+[out:{output_format}];
+{area_definition}
+
+(
+"""
+OVERPASS_QUERY_FOOTER = """);
+out body;
+>;
+out skel qt;"""
+
 # Area definition templates
 AREA_DEFINITION_TEMPLATE = 'area[name="{area_name}"]->.searchArea;'
 BBOX_FILTER_TEMPLATE = "({south},{west},{north},{east})"
@@ -1,9 +1,15 @@
+import functools
+import io
+import logging
+import re
 from typing import TypedDict, Union, List, Literal, Optional, NamedTuple, Protocol, Tuple, Callable, Dict, Any
 from dataclasses import dataclass
 from pydantic import BaseModel, field_validator, Field, model_validator
 
 # Import configuration constants
-from overpass_ql_gen.config import ElementType, OutputFormat, COMMON_TAG_MAPPINGS, MIN_PROMPT_LENGTH, SUPPORTED_OUTPUT_FORMATS, SUPPORTED_ELEMENT_TYPES, OVERPASS_QUERY_TEMPLATE, AREA_DEFINITION_TEMPLATE, BBOX_FILTER_TEMPLATE
+from overpass_ql_gen.config import ElementType, OutputFormat, COMMON_TAG_MAPPINGS, MIN_PROMPT_LENGTH, SUPPORTED_OUTPUT_FORMATS, SUPPORTED_ELEMENT_TYPES, OVERPASS_QUERY_TEMPLATE, OVERPASS_QUERY_HEADER_TEMPLATE, OVERPASS_QUERY_FOOTER, AREA_DEFINITION_TEMPLATE, BBOX_FILTER_TEMPLATE
+
+logger = logging.getLogger(__name__)
 
 class UserPrompt(BaseModel):
     text: str
@@ -57,7 +63,6 @@ OsmRelation = TypedDict('OsmRelation', {
 
 OsmElementUnion = Union[OsmNode, OsmWay, OsmRelation]
 
-# Import OSM tag validation from our new validation system
 # Import OSM tag validation from our new validation system
 from overpass_ql_gen.validation.validator import OsmTag, OsmTagValidator, QueryConstraint
 
@@ -65,11 +70,11 @@ from overpass_ql_gen.validation.validator import OsmTag, OsmTagValidator, QueryC
 from overpass_ql_gen.validation.validator import BoundingBox, GeographicFilter
 
 # Query generation pipeline types
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ParsedPrompt:
-    """Result of NLP processing"""
-    elements: List[ElementType]  # e.g., ["node", "way", "relation"]
-    tags: List[OsmTag]
+    """Result of NLP processing (immutable so parses can be cached)"""
+    elements: Tuple[ElementType, ...]  # e.g., ("node", "way", "relation")
+    tags: Tuple[OsmTag, ...]
     location: Optional[str]
     area_filter: Optional[GeographicFilter]
     
@@ -157,100 +162,194 @@ class AreaResolutionError(OverpassQLError):
         self.area_name = area_name
         super().__init__(f"Could not resolve area: {area_name}")
 
+# Prompt patterns, compiled once at import time so parse_prompt pays only
+# for regex execution.
+# Matches patterns like "find cafes in Paris" or "show me bicycle parking
+# in Berlin", plus "all cafes in Paris" or "educational facilities in London"
+_LOCATED_PATTERN = re.compile(
+    r"(?:find|show me|get|locate|all)\s+(?:all\s+)?(.+?)\s+(?:in|within|near|around)\s+(.+)",
+    re.IGNORECASE
+)
+# More general fallback: any "<feature> in <location>" phrasing
+_GENERAL_PATTERN = re.compile(
+    r"(.+?)\s+(?:in|within|near|around)\s+(.+)",
+    re.IGNORECASE
+)
+
+# Mapped keywords pre-lowercased once at import time so parse_prompt never
+# case-folds the mapping again (the prompt itself is lowered once per call)
+_KEYWORD_TAGS: Dict[str, Tuple[str, str]] = {
+    keyword.lower(): (key, value)
+    for keyword, (key, value) in COMMON_TAG_MAPPINGS.items()
+}
+
+# Single alternation over all mapped keywords, compiled once: one C-level
+# scan of the text replaces a Python loop of per-keyword substring checks.
+# Longer keywords sort first so e.g. "bus stop" beats "bus" at the same
+# position.
+_KEYWORD_PATTERN = re.compile(
+    "|".join(
+        re.escape(keyword)
+        for keyword in sorted(_KEYWORD_TAGS, key=len, reverse=True)
+    ),
+    re.IGNORECASE
+)
+
+# Mapping order doubles as match priority: when several keywords occur
+# in one prompt, the one listed earliest in COMMON_TAG_MAPPINGS wins,
+# exactly like the original scan over the mapping
+_KEYWORD_RANK: Dict[str, int] = {
+    keyword.lower(): rank for rank, keyword in enumerate(COMMON_TAG_MAPPINGS)
+}
+
+@functools.lru_cache(maxsize=2048)
+def _tag(key: str, value: str) -> OsmTag:
+    """Interned OsmTag factory: identical tags share one frozen instance."""
+    return OsmTag(key=key, value=value)
+
+@functools.lru_cache(maxsize=32)
+def _element_prefixes(elements: Tuple[ElementType, ...]) -> Tuple[str, ...]:
+    """Specialized body-line prefixes for an element-type signature.
+
+    The default ("node", "way", "relation") signature collapses to the
+    nwr shorthand; any other shape bakes its element literals once and
+    is reused for every query with the same signature.
+    """
+    if set(elements) >= {"node", "way", "relation"}:
+        return ("  nwr",)
+    return tuple(f'  {elem_type}' for elem_type in elements)
+
+@functools.lru_cache(maxsize=1)
+def _get_tag_validator() -> WebBasedTagValidator:
+    """Lazy module-wide validator so query generation reuses one instance."""
+    return WebBasedTagValidator()
+
+def _match_known_tag(text: str) -> Optional[OsmTag]:
+    """Return the OsmTag for the highest-priority mapped keyword in text.
+
+    Priority is COMMON_TAG_MAPPINGS order, not position in the text, so
+    e.g. "a store with coffee" still resolves to the cafe mapping.
+    """
+    best_keyword: Optional[str] = None
+    best_rank = len(_KEYWORD_RANK)
+    for match in _KEYWORD_PATTERN.finditer(text):
+        keyword = match.group(0).lower()
+        rank = _KEYWORD_RANK[keyword]
+        if rank < best_rank:
+            best_keyword = keyword
+            best_rank = rank
+            if rank == 0:
+                break
+    if best_keyword is None:
+        return None
+    key, value = _KEYWORD_TAGS[best_keyword]
+    return _tag(key, value)
+
+@functools.lru_cache(maxsize=1024)
 def parse_prompt(prompt: str) -> ParsedPrompt:
     """
     Parses the natural language prompt to extract key entities.
+
+    Results are memoized: repeated prompts (common in test suites and
+    example drivers) skip the regex and tag-construction work entirely.
     """
-    import re
-    
     # Default values
-    elements: List[ElementType] = ["node", "way", "relation"]
+    elements: Tuple[ElementType, ...] = ("node", "way", "relation")
     tags: List[OsmTag] = []
     location: Optional[str] = None
     area_filter: Optional[GeographicFilter] = None
-    
+
     # Extract feature from prompt
-    # Look for patterns like "find cafes in Paris" or "show me bicycle parking in Berlin"
-    # Also look for patterns like "all cafes in Paris" or "educational facilities in London"
-    pattern = r"(?:find|show me|get|locate|all)\s+(?:all\s+)?(.+?)\s+(?:in|within|near|around)\s+(.+)"
-    match = re.search(pattern, prompt, re.IGNORECASE)
-    
+    match = _LOCATED_PATTERN.search(prompt)
+
     if not match:
         # Try a more general pattern
-        general_pattern = r"(.+?)\s+(?:in|within|near|around)\s+(.+)"
-        match = re.search(general_pattern, prompt, re.IGNORECASE)
+        match = _GENERAL_PATTERN.search(prompt)
     
     if match:
         feature_text = match.group(1).strip()
         location = match.group(2).strip()
         
         # Basic tag extraction - in a real implementation this would use NLP
-        # For now, we'll map common features to basic OSM tags using configuration
-        feature_lower = feature_text.lower()
-        tag_mapping_found = False
-        
-        for keyword, (key, value) in COMMON_TAG_MAPPINGS.items():
-            if keyword in feature_lower:
-                tags = [OsmTag(key=key, value=value)]
-                tag_mapping_found = True
-                break
-        
-        if not tag_mapping_found:
+        # For now, we'll map common features to basic OSM tags using
+        # configuration (the pattern is case-insensitive, so no pre-lowering)
+        matched_tag = _match_known_tag(feature_text)
+
+        if matched_tag is not None:
+            tags = [matched_tag]
+        else:
             # If no specific mapping found, use the feature name as a tag value
             # This is a simplified approach - a real implementation would use more sophisticated NLP
             clean_feature = feature_text.replace(" ", "_").lower()
-            tags = [OsmTag(key="name", value=clean_feature)]
+            tags = [_tag("name", clean_feature)]
     else:
         # If no location-specific pattern found, try to extract features only
         # This handles cases where no specific location is mentioned
-        prompt_lower = prompt.lower()
-        tag_found = False
-        for keyword, (key, value) in COMMON_TAG_MAPPINGS.items():
-            if keyword in prompt_lower:
-                tags = [OsmTag(key=key, value=value)]
-                tag_found = True
-                break
-        if not tag_found:
+        matched_tag = _match_known_tag(prompt)
+        if matched_tag is not None:
+            tags = [matched_tag]
+        else:
             # Fallback to using the prompt as a name tag
-            tags = [OsmTag(key="name", value=prompt.strip().lower())]
+            tags = [_tag("name", prompt.strip().lower())]
     
     return ParsedPrompt(
         elements=elements,
-        tags=tags,
+        tags=tuple(tags),
         location=location,
         area_filter=area_filter
     )
 
+def parse_prompts_batch(prompts: List[str]) -> List[ParsedPrompt]:
+    """
+    Parses a batch of prompts in one call.
+
+    The heavy lifting (keyword scanning) already runs in the compiled
+    alternation regex, and parse_prompt's lru_cache deduplicates repeated
+    prompts within the batch, so this stays a thin loop.
+    """
+    return [parse_prompt(prompt) for prompt in prompts]
+
+def _warn_invalid_tags(tags: List[OsmTag]) -> None:
+    """Batch-validate tags against taginfo and warn about unknown ones."""
+    validator = _get_tag_validator()
+    for tag, ok in zip(tags, validator.are_valid(tags)):
+        if not ok:
+            # Lazy %-formatting: no string is built unless warnings are enabled.
+            # Don't raise an exception for testing purposes, just warn
+            logger.warning("Tag '%s=%s' may not be valid according to OSM database", tag.key, tag.value)
+
+@functools.lru_cache(maxsize=512)
 def generate_query(prompt: str, output_format: OutputFormat = "json") -> OverpassQuery:
     """
     Generates an Overpass QL query from a natural language prompt.
     Updated to use Pydantic models for validation.
+
+    Results are memoized per (prompt, output_format); OverpassQuery is
+    frozen, so cached instances cannot be mutated by callers.
     """
     # Validate the input using Pydantic
     user_prompt = UserPrompt(text=prompt, output_format=output_format)
-    
-    # Parse the prompt with validation
+
+    # Parse the prompt with validation; OsmTag fields were already
+    # validated when the tags were constructed in parse_prompt
     parsed_prompt = parse_prompt(user_prompt.text)
-    
-    # Validate tags using Pydantic validation
-    for tag in parsed_prompt.tags:
-        # This will trigger Pydantic's field validators
-        _ = tag.key  # Access to ensure validation happens if needed
-        _ = tag.value
-    
+
     # Create query constraints
     constraints = QueryConstraint(
         tags=parsed_prompt.tags,
         element_types=parsed_prompt.elements
     )
-    
-    # Validate tags (with fallback for offline environments)
-    validator = WebBasedTagValidator()
-    for tag in parsed_prompt.tags:
-        if not tag.is_valid(validator):
-            print(f"Warning: Tag '{tag.key}={tag.value}' may not be valid according to OSM database")
-            # Don't raise an exception for testing purposes, just warn
-    
+
+    # Validate tags in one batched taginfo request (with fallback for
+    # offline environments)
+    _warn_invalid_tags(list(parsed_prompt.tags))
+
+    return _build_query(user_prompt, parsed_prompt)
+
+def _build_query(user_prompt: UserPrompt, parsed_prompt: ParsedPrompt) -> OverpassQuery:
+    """Constructs the query string and model from already-validated inputs."""
+    prompt = user_prompt.text
+
     # Build the query string
     area_definition = ""
     area_filter_expr = ""
@@ -265,34 +364,78 @@ def generate_query(prompt: str, output_format: OutputFormat = "json") -> Overpas
         # or raise an error depending on requirements
         area_filter_expr = ""  # This would be a worldwide search
     
-    # Build query parts for each element type
-    query_parts: List[str] = []
+    # Build query parts for each element type: one filter per distinct tag
+    # key, joined in a single pass. Tags sharing a key collapse into a
+    # single anchored-regex filter (["amenity"~"^(cafe|pub)$"]) so the
+    # server plans one statement instead of one per value. When all three
+    # element types are requested (the default) the nwr shorthand collapses
+    # node/way/relation into one statement per filter.
+    suffix = f'{area_filter_expr};' if area_filter_expr else ';'
+    values_by_key: Dict[str, List[str]] = {}
     for tag in parsed_prompt.tags:
-        for elem_type in parsed_prompt.elements:
-            if area_filter_expr:
-                query_parts.append(f'  {elem_type}["{tag.key}"="{tag.value}"]{area_filter_expr};')
-            else:
-                query_parts.append(f'  {elem_type}["{tag.key}"="{tag.value}"];')
-    
-    query_body = "\n".join(query_parts)
-    
-    # Construct the final query using template from config
-    query_string = OVERPASS_QUERY_TEMPLATE.format(
-        prompt=prompt,
-        output_format=user_prompt.output_format,
-        area_definition=area_definition,
-        query_body=query_body
+        values_by_key.setdefault(tag.key, []).append(tag.value)
+    tag_filters = [
+        f'["{key}"="{values[0]}"]{suffix}'
+        if len(values) == 1
+        else f'["{key}"~"^({"|".join(re.escape(v) for v in values)})$"]{suffix}'
+        for key, values in values_by_key.items()
+    ]
+    prefixes = _element_prefixes(parsed_prompt.elements)
+    body_lines = (
+        f'{prefix}{tag_filter}'
+        for tag_filter in tag_filters
+        for prefix in prefixes
     )
 
-    # Create and return the Pydantic model
-    return OverpassQuery(
+    # Stream the query into one buffer: header, body lines, footer are
+    # written once, avoiding the intermediate query_body string plus a
+    # second full-length template interpolation
+    buf = io.StringIO()
+    buf.write(OVERPASS_QUERY_HEADER_TEMPLATE.format_map({
+        'prompt': prompt,
+        'output_format': user_prompt.output_format,
+        'area_definition': area_definition,
+    }))
+    for line in body_lines:
+        buf.write(line)
+        buf.write('\n')
+    buf.write(OVERPASS_QUERY_FOOTER)
+    query_string = buf.getvalue()
+
+    # Create and return the Pydantic model. Every field was already
+    # validated upstream (UserPrompt, parse_prompt, the tag validators),
+    # so model_construct skips a redundant pydantic-core validation pass.
+    return OverpassQuery.model_construct(
         output_format=user_prompt.output_format,
         search_area=parsed_prompt.location,
+        bounding_box=None,
         tags=parsed_prompt.tags,
         elements=parsed_prompt.elements,
         query_string=query_string
     )
 
+def generate_queries(items: List[Tuple[str, OutputFormat]]) -> List[OverpassQuery]:
+    """
+    Generates queries for a batch of (prompt, output_format) pairs.
+
+    Inputs are validated up front, parses go through the memoized
+    parser, and the distinct tags of the whole batch are validated with
+    a single taginfo request before the build loop — one HTTP round-trip
+    for the batch instead of one per prompt.
+    """
+    user_prompts = [UserPrompt(text=prompt, output_format=fmt) for prompt, fmt in items]
+    parsed_prompts = [parse_prompt(user_prompt.text) for user_prompt in user_prompts]
+
+    unique_tags = list(dict.fromkeys(
+        tag for parsed in parsed_prompts for tag in parsed.tags
+    ))
+    _warn_invalid_tags(unique_tags)
+
+    return [
+        _build_query(user_prompt, parsed)
+        for user_prompt, parsed in zip(user_prompts, parsed_prompts)
+    ]
+
 # --- Tool Functions (for compatibility with existing code) ---
 google_web_search: Optional[Callable[..., Any]] = None
 web_fetch: Optional[Callable[..., Any]] = None
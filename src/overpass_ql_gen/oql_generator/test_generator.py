@@ -2,7 +2,9 @@ import unittest
 from unittest.mock import patch, MagicMock
 from overpass_ql_gen.oql_generator.generator import (
     parse_prompt,
+    parse_prompts_batch,
     generate_query,
+    generate_queries,
     OsmTag,
     ParsedPrompt,
     GeographicFilter,
@@ -61,6 +63,44 @@ class TestGenerator(unittest.TestCase):
         self.assertIn("London", result.query_string)
         self.assertIn("xml", result.query_string)
 
+    def test_keyword_priority_follows_mapping_order(self) -> None:
+        """
+        Tests that when several keywords match, the one listed earliest
+        in COMMON_TAG_MAPPINGS wins, not the one appearing first in the text.
+        """
+        # "store" appears before "coffee" in the text, but "coffee" is
+        # mapped earlier, so the prompt resolves to the cafe tag
+        result = parse_prompt("Find a store with coffee in Berlin")
+
+        self.assertEqual(result.tags[0].key, "amenity")
+        self.assertEqual(result.tags[0].value, "cafe")
+
+    def test_parse_prompts_batch(self) -> None:
+        """
+        Tests that parse_prompts_batch matches parse_prompt per prompt.
+        """
+        prompts = ["Find all cafes in Paris", "Find all libraries in London"]
+        results = parse_prompts_batch(prompts)
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0], parse_prompt(prompts[0]))
+        self.assertEqual(results[1], parse_prompt(prompts[1]))
+        self.assertEqual(results[0].tags[0].value, "cafe")
+        self.assertEqual(results[1].tags[0].value, "library")
+
+    def test_generate_queries_batch(self) -> None:
+        """
+        Tests that generate_queries matches generate_query per pair.
+        """
+        items = [("Find all cafes in Paris", "json"), ("Find all libraries in London", "xml")]
+        results = generate_queries(items)
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0].query_string, generate_query(*items[0]).query_string)
+        self.assertEqual(results[1].query_string, generate_query(*items[1]).query_string)
+        self.assertIn("Paris", results[0].query_string)
+        self.assertIn("xml", results[1].query_string)
+
     def test_parsed_prompt_structure(self) -> None:
         """
         Tests the structure of the ParsedPrompt dataclass.
@@ -4,8 +4,12 @@ Functional Test Suite for Overpass QL Generator
 This module contains comprehensive functional tests that validate 
 Overpass QL queries by comparing their results against the Overpass API.
 """
+import io
+import json
+import time
 import unittest
 from typing import Dict, Any, List
+from unittest.mock import MagicMock, patch
 import sys
 import os
 
@@ -15,11 +19,12 @@ project_root = os.path.dirname(os.path.dirname(current_dir))
 sys.path.insert(0, project_root)
 
 from overpass_ql_gen.testing.overpass_functional_tester import (
-    OverpassFunctionalTester, FunctionalTest, FunctionalTestSuite, 
-    TestStatus, QueryTestResult
+    OverpassFunctionalTester, FunctionalTest, FunctionalTestSuite,
+    TestStatus, QueryTestResult, _TokenBucket
 )
 from overpass_ql_gen.testing.test_utilities import (
-    summarize_result, compare_element_counts, calculate_result_similarity
+    summarize_result, compare_element_counts, calculate_result_similarity,
+    ElementIndex, get_element_ids, result_from_bytes
 )
 from overpass_ql_gen.oql_generator.generator import generate_query
 
@@ -336,6 +341,199 @@ class OverpassFunctionalTestSuite(unittest.TestCase):
         return self.tester.run_test_suite(suite)
 
 
+def _mock_response(payload: Dict[str, Any]) -> MagicMock:
+    """Build a fake requests response carrying the given Overpass payload."""
+    body = json.dumps(payload).encode()
+    response = MagicMock()
+    response.status_code = 200
+    response.content = body
+    response.raw = io.BytesIO(body)
+    response.json.return_value = payload
+    return response
+
+
+class OfflineUnitTestSuite(unittest.TestCase):
+    """Offline unit tests for the tester internals and result utilities.
+
+    Everything here runs against canned payloads or mocked sessions;
+    no test in this class touches the Overpass API.
+    """
+
+    SAMPLE_RESULT = {
+        "version": 0.6,
+        "elements": [
+            {"type": "node", "id": 1, "lat": 48.85, "lon": 2.35,
+             "tags": {"amenity": "cafe", "name": "A"}},
+            {"type": "node", "id": 2, "lat": 48.86, "lon": 2.36,
+             "tags": {"amenity": "cafe"}},
+            {"type": "way", "id": 3, "tags": {"amenity": "restaurant"}},
+        ]
+    }
+
+    def test_token_bucket_spaces_acquires(self) -> None:
+        """Consecutive acquires are spaced by at least the configured rate"""
+        bucket = _TokenBucket(0.05)
+        start = time.monotonic()
+        for _ in range(3):
+            bucket.acquire()
+        # The first acquire is free; the next two each wait one interval
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_token_bucket_penalize_delays_next_acquire(self) -> None:
+        """A penalty pushes the next send slot out even at rate zero"""
+        bucket = _TokenBucket(0.0)
+        bucket.penalize(0.1)
+        start = time.monotonic()
+        bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_split_generated_query(self) -> None:
+        """Template-shaped queries split into (area definition, body)"""
+        query = generate_query("Find all cafes in Paris").query_string
+        parts = OverpassFunctionalTester._split_generated_query(query)
+
+        self.assertIsNotNone(parts)
+        area_definition, body = parts
+        self.assertIn('area[name="Paris"]', area_definition)
+        self.assertIn('amenity', body)
+
+        # Queries that don't follow the template can't be merged
+        self.assertIsNone(
+            OverpassFunctionalTester._split_generated_query("[out:json]; out body;")
+        )
+
+    def test_execute_query_caches_and_count_elements_reuses_cache(self) -> None:
+        """A cached payload serves both execute_query and count_elements"""
+        session = MagicMock()
+        session.post.return_value = _mock_response(self.SAMPLE_RESULT)
+        tester = OverpassFunctionalTester(rate_limit_delay=0.0, session=session)
+
+        query = "[out:json]; node[amenity=cafe]; out body;"
+        result = tester.execute_query(query)
+
+        self.assertEqual(len(result['elements']), 3)
+        self.assertEqual(session.post.call_count, 1)
+
+        # Same query within the TTL: answered from the cache, no new request
+        self.assertEqual(tester.execute_query(query), result)
+        self.assertEqual(tester.count_elements(query), 3)
+        self.assertEqual(session.post.call_count, 1)
+
+    def test_run_test_suite_batched_splits_combined_response(self) -> None:
+        """Batched suites slice the combined stream back into per-test results"""
+        combined = {
+            "elements": [
+                {"type": "node", "id": 1, "tags": {"amenity": "cafe"}},
+                {"type": "node", "id": 2, "tags": {"amenity": "cafe"}},
+                {"type": "count", "id": 0},
+                {"type": "node", "id": 3, "tags": {"amenity": "library"}},
+                {"type": "count", "id": 0},
+            ]
+        }
+        tester = OverpassFunctionalTester(rate_limit_delay=0.0, session=MagicMock())
+        suite = FunctionalTestSuite(name="Batched", description="Offline batched run")
+        suite.tests = [
+            FunctionalTest(
+                name="Paris Cafes",
+                description="Cafes in Paris",
+                generated_query=generate_query("Find all cafes in Paris").query_string
+            ),
+            FunctionalTest(
+                name="London Libraries",
+                description="Libraries in London",
+                generated_query=generate_query("Find all libraries in London").query_string
+            ),
+        ]
+
+        with patch.object(tester, 'execute_query', return_value=combined) as mock_execute:
+            suite = tester.run_test_suite_batched(suite)
+
+        # Both tests ran from a single combined request
+        self.assertEqual(mock_execute.call_count, 1)
+        self.assertEqual(len(suite.results), 2)
+        self.assertEqual(suite.results[0].result_count, 2)
+        self.assertEqual(suite.results[1].result_count, 1)
+        self.assertEqual(suite.results[0].status, TestStatus.PASSED)
+        self.assertEqual(suite.results[1].status, TestStatus.PASSED)
+
+    def test_count_tolerance_tests_are_not_batched(self) -> None:
+        """Count-tolerance tests run individually: the merged request
+        drops the template's `>;` recursion, so batched counts would
+        exclude member nodes that a single run includes"""
+        tester = OverpassFunctionalTester(rate_limit_delay=0.0, session=MagicMock())
+        suite = FunctionalTestSuite(name="Counts", description="Count-tolerance suite")
+        suite.tests = [
+            FunctionalTest(
+                name="Paris Cafes",
+                description="Cafes in Paris",
+                generated_query=generate_query("Find all cafes in Paris").query_string,
+                expected_element_count=2
+            ),
+        ]
+
+        sentinel = QueryTestResult(
+            query="single", status=TestStatus.PASSED,
+            execution_time=0.0, result_count=2
+        )
+        with patch.object(tester, 'run_single_test', return_value=sentinel) as mock_single, \
+                patch.object(tester, '_run_batch') as mock_batch:
+            suite = tester.run_test_suite_batched(suite)
+
+        mock_single.assert_called_once()
+        mock_batch.assert_not_called()
+        self.assertEqual(suite.results, [sentinel])
+
+    def test_validate_element_tags_with_shared_key(self) -> None:
+        """Expected tags sharing a key are each counted independently"""
+        tester = OverpassFunctionalTester(rate_limit_delay=0.0, session=MagicMock())
+        validation = tester.validate_element_tags(
+            self.SAMPLE_RESULT, ["amenity=cafe", "amenity=restaurant", "amenity=school"]
+        )
+
+        self.assertEqual(
+            validation["elements_with_expected_tags"],
+            {"amenity=cafe": 2, "amenity=restaurant": 1, "amenity=school": 0}
+        )
+        self.assertEqual(validation["missing_tags"], ["amenity=school"])
+
+    def test_element_index_lookups(self) -> None:
+        """ElementIndex answers by_tag and count_values from one pass"""
+        index = ElementIndex(self.SAMPLE_RESULT)
+
+        self.assertEqual(len(index.by_tag("amenity")), 3)
+        self.assertEqual(len(index.by_tag("amenity", "cafe")), 2)
+        self.assertEqual(index.by_tag("amenity", "cafe")[0]['id'], 1)
+        self.assertEqual(index.count_values("amenity"), {"cafe": 2, "restaurant": 1})
+        self.assertEqual(index.by_tag("highway"), [])
+
+    def test_result_from_bytes_roundtrip(self) -> None:
+        """result_from_bytes decodes a raw response body into the result dict"""
+        body = json.dumps(self.SAMPLE_RESULT).encode()
+        self.assertEqual(result_from_bytes(body), self.SAMPLE_RESULT)
+
+    def test_get_element_ids_preserves_type_names(self) -> None:
+        """Element IDs keep their OSM type name, including unknown types"""
+        result = {"elements": [
+            {"type": "node", "id": 1},
+            {"type": "way", "id": 2},
+            {"type": "area", "id": 3},
+        ]}
+        self.assertEqual(get_element_ids(result), {"node_1", "way_2", "area_3"})
+
+    def test_similarity_of_identical_and_disjoint_results(self) -> None:
+        """Similarity is 1.0 for identical results and 0.0 for disjoint ones"""
+        self.assertEqual(
+            calculate_result_similarity(self.SAMPLE_RESULT, self.SAMPLE_RESULT), 1.0
+        )
+        other = {"elements": [{"type": "node", "id": 99}]}
+        self.assertEqual(calculate_result_similarity(self.SAMPLE_RESULT, other), 0.0)
+        # Two empty results only count as similar under the set-based methods
+        self.assertEqual(
+            calculate_result_similarity({"elements": []}, {"elements": []}, method="jaccard"),
+            1.0
+        )
+
+
 def run_all_tests():
     """Run all functional tests and display results"""
     print("Running Overpass QL Functional Tests...")
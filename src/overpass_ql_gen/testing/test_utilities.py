@@ -4,10 +4,31 @@ Test Utilities for Overpass QL Functional Testing
 This module provides various utilities for comparing, analyzing, and 
 validating Overpass QL query results.
 """
-from typing import Dict, Any, List, Optional, Set
+from typing import Dict, Any, Iterator, List, Optional, Set
 from collections import Counter
 import json
 
+# Optional vectorized path for coordinate statistics. numpy ships with
+# the pandas dependency in practice, but is not required here
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Optional fast JSON codec, mirroring the functional tester: orjson
+# decodes/encodes bytes directly, several times faster than stdlib json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def result_from_bytes(data: bytes) -> Dict[str, Any]:
+    """Decode a raw Overpass response body into the result dict."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 def extract_elements_by_type(result: Dict[str, Any], element_type: str) -> List[Dict[str, Any]]:
     """Extract elements of a specific type from query results."""
@@ -15,104 +36,152 @@ def extract_elements_by_type(result: Dict[str, Any], element_type: str) -> List[
     return [elem for elem in elements if elem.get('type') == element_type]
 
 
+class ElementIndex:
+    """Tag index over one result for repeated (key, value) probes.
+
+    Built in a single pass; K lookups then cost O(K + matches) instead
+    of the O(K*N) of re-scanning the element list per probe.
+    """
+
+    def __init__(self, result: Dict[str, Any]):
+        self._by_key: Dict[str, List[tuple]] = {}
+        for elem in result.get('elements', ()):
+            for key, value in elem.get('tags', {}).items():
+                self._by_key.setdefault(key, []).append((value, elem))
+
+    def by_tag(self, tag_key: str, tag_value: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Elements carrying the tag, optionally filtered by value."""
+        entries = self._by_key.get(tag_key, ())
+        if tag_value is None:
+            return [elem for _, elem in entries]
+        return [elem for value, elem in entries if value == tag_value]
+
+    def count_values(self, tag_key: str) -> Dict[str, int]:
+        """Occurrence counts of each value seen for the key."""
+        # Counter tallies the stream in C and is itself a dict; copying
+        # it into a plain dict would just double the allocation
+        return Counter(value for value, _ in self._by_key.get(tag_key, ()))
+
+
 def extract_elements_by_tag(result: Dict[str, Any], tag_key: str, tag_value: Optional[str] = None) -> List[Dict[str, Any]]:
     """Extract elements with a specific tag from query results."""
-    elements = result.get('elements', [])
-    matching_elements = []
-    
-    for elem in elements:
-        tags = elem.get('tags', {})
-        if tag_key in tags:
-            if tag_value is None or tags[tag_key] == tag_value:
-                matching_elements.append(elem)
-    
-    return matching_elements
+    return ElementIndex(result).by_tag(tag_key, tag_value)
 
 
 def count_tag_values(result: Dict[str, Any], tag_key: str) -> Dict[str, int]:
     """Count occurrences of different values for a specific tag."""
-    elements = result.get('elements', [])
-    values = []
-    
-    for elem in elements:
-        tags = elem.get('tags', {})
-        if tag_key in tags:
-            values.append(tags[tag_key])
-    
-    return dict(Counter(values))
+    return ElementIndex(result).count_values(tag_key)
+
+
+# Element types packed into the top bits of an int key, mirroring the
+# functional tester: int sets hash far cheaper than "type_id" strings.
+# Internal to similarity only — the packing is lossy for types outside
+# node/way/relation (they all share code 3)
+_TYPE_CODE = {"node": 0, "way": 1, "relation": 2}
+
+
+def _packed_element_ids(result: Dict[str, Any]) -> Set[int]:
+    """Element identities as (type_code << 62) | id packed ints."""
+    return {
+        (_TYPE_CODE.get(elem['type'], 3) << 62) | elem['id']
+        for elem in result.get('elements', [])
+        if 'id' in elem and 'type' in elem
+    }
 
 
 def get_element_ids(result: Dict[str, Any]) -> Set[str]:
     """Get a set of all element IDs in the result."""
-    elements = result.get('elements', [])
-    ids = set()
-    
-    for elem in elements:
-        if 'id' in elem and 'type' in elem:
-            ids.add(f"{elem['type']}_{elem['id']}")
-    
-    return ids
+    return {
+        f"{elem['type']}_{elem['id']}"
+        for elem in result.get('elements', [])
+        if 'id' in elem and 'type' in elem
+    }
 
 
 def compare_element_counts(result1: Dict[str, Any], result2: Dict[str, Any]) -> Dict[str, Any]:
-    """Compare element counts between two results."""
+    """Compare element counts between two results.
+
+    Each result is tallied in a single pass instead of one filtered
+    list materialization per element type.
+    """
+    counts1 = Counter(elem.get('type') for elem in result1.get('elements', ()))
+    counts2 = Counter(elem.get('type') for elem in result2.get('elements', ()))
+
     return {
         "nodes": {
-            "result1": len(extract_elements_by_type(result1, "node")),
-            "result2": len(extract_elements_by_type(result2, "node")),
+            "result1": counts1["node"],
+            "result2": counts2["node"],
         },
         "ways": {
-            "result1": len(extract_elements_by_type(result1, "way")),
-            "result2": len(extract_elements_by_type(result2, "way")),
+            "result1": counts1["way"],
+            "result2": counts2["way"],
         },
         "relations": {
-            "result1": len(extract_elements_by_type(result1, "relation")),
-            "result2": len(extract_elements_by_type(result2, "relation")),
+            "result1": counts1["relation"],
+            "result2": counts2["relation"],
         },
         "total": {
-            "result1": len(result1.get('elements', [])),
-            "result2": len(result2.get('elements', [])),
+            "result1": counts1.total(),
+            "result2": counts2.total(),
         }
     }
 
 
 def compare_tag_distributions(result1: Dict[str, Any], result2: Dict[str, Any], tag_key: str) -> Dict[str, Any]:
-    """Compare tag distributions between two results."""
+    """Compare tag distributions between two results.
+
+    The two distributions are merged directly instead of materializing
+    a key-union set and re-probing both dicts per value.
+    """
     dist1 = count_tag_values(result1, tag_key)
     dist2 = count_tag_values(result2, tag_key)
-    
-    all_values = set(dist1.keys()) | set(dist2.keys())
-    
-    comparison = {}
-    for value in all_values:
-        comparison[value] = {
-            "result1": dist1.get(value, 0),
-            "result2": dist2.get(value, 0),
-            "diff": dist1.get(value, 0) - dist2.get(value, 0)
-        }
-    
+
+    comparison = {
+        value: {"result1": count, "result2": 0, "diff": count}
+        for value, count in dist1.items()
+    }
+    for value, count in dist2.items():
+        entry = comparison.get(value)
+        if entry is None:
+            comparison[value] = {"result1": 0, "result2": count, "diff": -count}
+        else:
+            entry["result2"] = count
+            entry["diff"] = entry["result1"] - count
+
     return comparison
 
 
-def validate_result_structure(result: Dict[str, Any]) -> List[str]:
-    """Validate the basic structure of query results."""
+def validate_result_structure(result: Dict[str, Any], max_errors: int = 50) -> List[str]:
+    """Validate the basic structure of query results.
+
+    Stops after max_errors problems so a badly malformed result with
+    millions of elements cannot build an error string per element.
+    """
     errors = []
-    
+
     if 'elements' not in result:
         errors.append("Missing 'elements' key in result")
-    elif not isinstance(result['elements'], list):
+        return errors
+
+    elements = result['elements']
+    if not isinstance(elements, list):
         errors.append("'elements' should be a list")
-    else:
-        for i, elem in enumerate(result['elements']):
-            if not isinstance(elem, dict):
-                errors.append(f"Element {i} is not a dictionary")
-                continue
-            
-            if 'type' not in elem:
-                errors.append(f"Element {i} missing 'type' field")
-            if 'id' not in elem:
-                errors.append(f"Element {i} missing 'id' field")
-    
+        return errors
+
+    for i, elem in enumerate(elements):
+        if len(errors) >= max_errors:
+            errors.append(f"... further errors truncated after {max_errors}")
+            break
+
+        if not isinstance(elem, dict):
+            errors.append(f"Element {i} is not a dictionary")
+            continue
+
+        if 'type' not in elem:
+            errors.append(f"Element {i} missing 'type' field")
+        if 'id' not in elem:
+            errors.append(f"Element {i} missing 'id' field")
+
     return errors
 
 
@@ -126,69 +195,129 @@ def calculate_result_similarity(result1: Dict[str, Any],
         result1, result2: Query results as dictionaries
         method: Similarity calculation method ('intersection', 'dice', 'jaccard')
     """
-    ids1 = get_element_ids(result1)
-    ids2 = get_element_ids(result2)
-    
-    intersection = len(ids1.intersection(ids2))
-    union = len(ids1.union(ids2))
+    ids1 = _packed_element_ids(result1)
+    ids2 = _packed_element_ids(result2)
     len1, len2 = len(ids1), len(ids2)
-    
+
+    # With an empty side the intersection is 0 and every formula
+    # reduces to its edge-case value without any set work
+    if not ids1 or not ids2:
+        if method == "intersection":
+            return 0.0
+        elif method in ("jaccard", "dice"):
+            return 1.0 if len1 == len2 else 0.0  # Both empty = 100% similar
+        raise ValueError(f"Unknown similarity method: {method}")
+
+    intersection = len(ids1.intersection(ids2))
+
     if method == "intersection":
         # Ratio of common elements to the smaller result
-        min_len = min(len1, len2) if min(len1, len2) > 0 else 1
-        return intersection / min_len
-    
+        return intersection / min(len1, len2)
+
     elif method == "jaccard":
-        # Jaccard similarity
-        return intersection / union if union > 0 else 1.0  # Both empty = 100% similar
-    
+        # Jaccard similarity; union size by cardinality arithmetic
+        return intersection / (len1 + len2 - intersection)
+
     elif method == "dice":
         # Dice coefficient
-        return (2 * intersection) / (len1 + len2) if (len1 + len2) > 0 else 1.0
-    
+        return (2 * intersection) / (len1 + len2)
+
     else:
         raise ValueError(f"Unknown similarity method: {method}")
 
 
 def summarize_result(result: Dict[str, Any]) -> Dict[str, Any]:
-    """Create a summary of the query result."""
+    """Create a summary of the query result.
+
+    Type counts, tag counts, geometry detection and the bounding box are
+    all gathered in one pass over the elements rather than re-walking
+    the list for each statistic.
+    """
     elements = result.get('elements', [])
-    
-    # Count element types
-    type_counts = Counter()
-    tag_counts = Counter()
-    
+
+    type_counts: Counter = Counter()
+    tag_counts: Counter = Counter()
+    min_lat = min_lon = float('inf')
+    max_lat = max_lon = float('-inf')
+    has_geometry = False
+
     for elem in elements:
-        elem_type = elem.get('type', 'unknown')
-        type_counts[elem_type] += 1
-        
-        for tag in elem.get('tags', {}):
-            tag_counts[tag] += 1
-    
+        type_counts[elem.get('type', 'unknown')] += 1
+
+        tags = elem.get('tags')
+        if tags:
+            tag_counts.update(tags.keys())
+
+        if 'lat' in elem and 'lon' in elem:
+            has_geometry = True
+            lat, lon = elem['lat'], elem['lon']
+            if lat < min_lat:
+                min_lat = lat
+            if lat > max_lat:
+                max_lat = lat
+            if lon < min_lon:
+                min_lon = lon
+            if lon > max_lon:
+                max_lon = lon
+
+    bbox = None
+    if has_geometry:
+        bbox = {
+            "south": min_lat,
+            "west": min_lon,
+            "north": max_lat,
+            "east": max_lon
+        }
+
     return {
         "total_elements": len(elements),
         "element_types": dict(type_counts),
         "common_tags": dict(tag_counts.most_common(10)),  # Top 10 tags
-        "has_geometry": any('lat' in elem and 'lon' in elem for elem in elements),
-        "bbox": calculate_bounding_box(result)
+        "has_geometry": has_geometry,
+        "bbox": bbox
     }
 
 
 def calculate_bounding_box(result: Dict[str, Any]) -> Optional[Dict[str, float]]:
-    """Calculate the bounding box of elements in the result."""
+    """Calculate the bounding box of elements in the result.
+
+    With numpy available the coordinates go straight into a flat float64
+    array and min/max run vectorized; otherwise a pure-Python pass is
+    used.
+    """
     elements = result.get('elements', [])
-    
+
+    if np is not None:
+        coords = np.fromiter(
+            (v for elem in elements
+             if 'lat' in elem and 'lon' in elem
+             for v in (elem['lat'], elem['lon'])),
+            dtype=np.float64
+        ).reshape(-1, 2)
+
+        if coords.size == 0:
+            return None
+
+        south, west = coords.min(axis=0)
+        north, east = coords.max(axis=0)
+        return {
+            "south": float(south),
+            "west": float(west),
+            "north": float(north),
+            "east": float(east)
+        }
+
     lats = []
     lons = []
-    
+
     for elem in elements:
         if 'lat' in elem and 'lon' in elem:
             lats.append(elem['lat'])
             lons.append(elem['lon'])
-    
+
     if not lats or not lons:
         return None
-    
+
     return {
         "south": min(lats),
         "west": min(lons),
@@ -197,46 +326,56 @@ def calculate_bounding_box(result: Dict[str, Any]) -> Optional[Dict[str, float]]
     }
 
 
+def _element_to_feature(elem: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Build the GeoJSON point feature for one element, if it has one."""
+    lat = elem.get('lat')
+    lon = elem.get('lon')
+    if lat is not None and lon is not None:
+        # Point geometry
+        return {
+            "type": "Feature",
+            "geometry": {
+                "type": "Point",
+                "coordinates": [lon, lat]
+            },
+            "properties": {
+                "id": elem.get('id'),
+                "type": elem.get('type'),
+                "tags": elem.get('tags', {}),
+                "timestamp": elem.get('timestamp')
+            }
+        }
+
+    center = elem.get('center')
+    if center is not None:
+        # Node with center point
+        return {
+            "type": "Feature",
+            "geometry": {
+                "type": "Point",
+                "coordinates": [center.get('lon'), center.get('lat')]
+            },
+            "properties": {
+                "id": elem.get('id'),
+                "type": elem.get('type'),
+                "tags": elem.get('tags', {}),
+                "is_center": True
+            }
+        }
+
+    return None
+
+
 def export_result_to_geojson(result: Dict[str, Any]) -> Dict[str, Any]:
     """Convert Overpass result to GeoJSON format for visualization."""
     elements = result.get('elements', [])
-    features = []
-    
-    for elem in elements:
-        if 'lat' in elem and 'lon' in elem:
-            # Point geometry
-            feature = {
-                "type": "Feature",
-                "geometry": {
-                    "type": "Point",
-                    "coordinates": [elem.get('lon'), elem.get('lat')]
-                },
-                "properties": {
-                    "id": elem.get('id'),
-                    "type": elem.get('type'),
-                    "tags": elem.get('tags', {}),
-                    "timestamp": elem.get('timestamp') if 'timestamp' in elem else None
-                }
-            }
-            features.append(feature)
-        elif 'center' in elem:
-            # Node with center point
-            center = elem['center']
-            feature = {
-                "type": "Feature",
-                "geometry": {
-                    "type": "Point",
-                    "coordinates": [center.get('lon'), center.get('lat')]
-                },
-                "properties": {
-                    "id": elem.get('id'),
-                    "type": elem.get('type'),
-                    "tags": elem.get('tags', {}),
-                    "is_center": True
-                }
-            }
-            features.append(feature)
-    
+
+    features = [
+        feature
+        for elem in elements
+        if (feature := _element_to_feature(elem)) is not None
+    ]
+
     return {
         "type": "FeatureCollection",
         "features": features,
@@ -248,17 +387,28 @@ def export_result_to_geojson(result: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def result_to_csv(result: Dict[str, Any], include_geometry: bool = True) -> List[Dict[str, Any]]:
-    """Convert Overpass result to CSV-friendly rows."""
+def export_result_to_geojson_bytes(result: Dict[str, Any]) -> bytes:
+    """Serialize the GeoJSON export straight to bytes for writing."""
+    geojson = export_result_to_geojson(result)
+    if orjson is not None:
+        return orjson.dumps(geojson)
+    return json.dumps(geojson).encode()
+
+
+def iter_result_rows(result: Dict[str, Any], include_geometry: bool = True) -> Iterator[Dict[str, Any]]:
+    """Yield CSV-friendly rows one at a time.
+
+    Streaming keeps the working set at a single row, so callers can
+    feed a csv.DictWriter directly without holding every row dict.
+    """
     elements = result.get('elements', [])
-    rows = []
-    
+
     for elem in elements:
         row = {
             "id": elem.get('id'),
             "type": elem.get('type'),
         }
-        
+
         # Add coordinates if available
         if include_geometry:
             if 'lat' in elem and 'lon' in elem:
@@ -267,11 +417,11 @@ def result_to_csv(result: Dict[str, Any], include_geometry: bool = True) -> List
             elif 'center' in elem:
                 row["latitude"] = elem['center'].get('lat')
                 row["longitude"] = elem['center'].get('lon')
-        
+
         # Add all tags as separate columns
         for tag_key, tag_value in elem.get('tags', {}).items():
             row[f"tag_{tag_key}"] = tag_value
-        
+
         # Add other attributes
         if 'timestamp' in elem:
             row["timestamp"] = elem['timestamp']
@@ -279,7 +429,30 @@ def result_to_csv(result: Dict[str, Any], include_geometry: bool = True) -> List
             row["version"] = elem['version']
         if 'user' in elem:
             row["user"] = elem['user']
-        
-        rows.append(row)
-    
-    return rows
\ No newline at end of file
+
+        yield row
+
+
+def collect_csv_fieldnames(result: Dict[str, Any], include_geometry: bool = True) -> List[str]:
+    """Collect the stable header for iter_result_rows in one light pass."""
+    fieldnames = ["id", "type"]
+    if include_geometry:
+        fieldnames += ["latitude", "longitude"]
+
+    tag_keys: Set[str] = set()
+    extras = []
+    for elem in result.get('elements', []):
+        tags = elem.get('tags')
+        if tags:
+            tag_keys.update(tags.keys())
+        for attr in ("timestamp", "version", "user"):
+            if attr in elem and attr not in extras:
+                extras.append(attr)
+
+    fieldnames += [f"tag_{key}" for key in sorted(tag_keys)]
+    return fieldnames + extras
+
+
+def result_to_csv(result: Dict[str, Any], include_geometry: bool = True) -> List[Dict[str, Any]]:
+    """Convert Overpass result to CSV-friendly rows."""
+    return list(iter_result_rows(result, include_geometry))
\ No newline at end of file
@@ -4,18 +4,36 @@ Validation System for Overpass QL Generator
 This module provides comprehensive validation for the Overpass QL generator,
 combining Pydantic's runtime validation with mypy's static type checking.
 """
-from typing import List, Literal, Optional, Protocol, Dict, Any, Tuple
-from pydantic import BaseModel, field_validator, model_validator, Field
+from typing import List, Literal, Optional, Protocol, Dict, Any, Sequence, Tuple
+from pydantic import BaseModel, ConfigDict, field_validator, model_validator, Field
 import requests
 from requests import RequestException
+import functools
 import re
+import threading
+import time
 
 # Import configuration constants
-from overpass_ql_gen.config import ElementType, OutputFormat, MAX_TAG_KEY_LENGTH, MAX_TAG_VALUE_LENGTH, MIN_LATITUDE, MAX_LATITUDE, MIN_LONGITUDE, MAX_LONGITUDE, SUPPORTED_OUTPUT_FORMATS, SUPPORTED_ELEMENT_TYPES
+from overpass_ql_gen.config import ElementType, OutputFormat, COMMON_TAG_MAPPINGS, MAX_TAG_KEY_LENGTH, MAX_TAG_VALUE_LENGTH, MIN_LATITUDE, MAX_LATITUDE, MIN_LONGITUDE, MAX_LONGITUDE, SUPPORTED_OUTPUT_FORMATS, SUPPORTED_ELEMENT_TYPES
+
+# Local fast path for tag validation: every tag the generator can emit
+# comes from COMMON_TAG_MAPPINGS, so membership here answers validity
+# without a taginfo round-trip
+_KNOWN_COMMON_TAGS = frozenset(COMMON_TAG_MAPPINGS.values())
+
+# Compiled once: OsmTag construction runs this per key, and re.match's
+# per-call cache lookup adds up under heavy tag creation
+_OSM_KEY_RE = re.compile(r'[A-Za-z0-9:_\-]+')
 
 
 class OsmTag(BaseModel):
-    """Pydantic model for OSM tags with validation."""
+    """Pydantic model for OSM tags with validation.
+
+    Frozen (and therefore hashable) so identical tags can be interned
+    and reused across parses.
+    """
+    model_config = ConfigDict(frozen=True, extra='forbid')
+
     key: str
     value: str
     
@@ -25,7 +43,7 @@ class OsmTag(BaseModel):
         if not v or len(v) > MAX_TAG_KEY_LENGTH:
             raise ValueError(f'OSM key must not be empty and less than {MAX_TAG_KEY_LENGTH + 1} chars')
         # Basic validation for valid characters in OSM keys
-        if not re.match(r'^[a-zA-Z0-9:_-]+$', v):
+        if not _OSM_KEY_RE.fullmatch(v):
             raise ValueError('OSM key contains invalid characters')
         return v
     
@@ -43,6 +61,8 @@ class OsmTag(BaseModel):
 
 class BoundingBox(BaseModel):
     """Pydantic model for geographic bounding boxes with validation."""
+    model_config = ConfigDict(extra='forbid')
+
     south: float
     west: float
     north: float
@@ -88,6 +108,8 @@ class GeographicFilter(BaseModel):
 
 class QueryConstraint(BaseModel):
     """Pydantic model for query constraints."""
+    model_config = ConfigDict(extra='forbid')
+
     tags: List[OsmTag]
     element_types: List[ElementType] = ["node", "way", "relation"]
     
@@ -102,16 +124,23 @@ class QueryConstraint(BaseModel):
 
 
 class OverpassQuery(BaseModel):
-    """Pydantic model for Overpass QL queries with validation."""
+    """Pydantic model for Overpass QL queries with validation.
+
+    Frozen, with tuple collections, so generated queries can be cached
+    and shared safely — neither the model nor its tag/element sequences
+    can be mutated by callers.
+    """
+    model_config = ConfigDict(frozen=True, extra='forbid')
+
     output_format: OutputFormat = "json"
     search_area: Optional[str] = None
     bounding_box: Optional[Tuple[float, float, float, float]] = None
-    tags: List[OsmTag]
-    elements: List[ElementType] = ["node", "way", "relation"]
+    tags: Tuple[OsmTag, ...]
+    elements: Tuple[ElementType, ...] = ("node", "way", "relation")
     query_string: str = ""
-    
+
     @field_validator('elements')
-    def validate_elements(cls, v: List[str]) -> List[ElementType]:
+    def validate_elements(cls, v: Tuple[str, ...]) -> Tuple[ElementType, ...]:
         """Validate the element types in the query."""
         allowed_elements: List[ElementType] = ['node', 'way', 'relation']
         for element in v:
@@ -135,36 +164,122 @@ class OverpassQuery(BaseModel):
 class OsmTagValidator(Protocol):
     """Protocol for OSM tag validation implementations."""
     def validate_tag(self, key: str, value: str) -> bool: ...
+    def are_valid(self, tags: Sequence['OsmTag']) -> List[bool]: ...
     def get_valid_values(self, key: str) -> List[str]: ...
 
 
 class WebBasedTagValidator:
-    """Implementation of OsmTagValidator using web APIs for validation."""
-    
-    def __init__(self, taginfo_base_url: str = "https://taginfo.openstreetmap.org/api/4"):
+    """Implementation of OsmTagValidator using web APIs for validation.
+
+    Lookups are memoized per instance: taginfo answers are stable, so a
+    repeated (key, value) costs a dict lookup instead of a network
+    round-trip. Negative answers expire after negative_cache_ttl seconds
+    so a transient API hiccup cannot pin a tag invalid forever.
+    """
+
+    def __init__(self,
+                 taginfo_base_url: str = "https://taginfo.openstreetmap.org/api/4",
+                 negative_cache_ttl: float = 300.0):
         self.taginfo_base_url = taginfo_base_url
-    
+        self.negative_cache_ttl = negative_cache_ttl
+        # Pooled keep-alive session: repeated taginfo lookups reuse one
+        # TCP+TLS connection instead of handshaking per request
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=16)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._cache_lock = threading.Lock()
+        self._tag_cache: Dict[Tuple[str, str], Tuple[bool, float]] = {}
+        self._values_cache: Dict[str, Tuple[List[str], float]] = {}
+
+    def _cached_tag_result(self, key: str, value: str) -> Optional[bool]:
+        """Return a locally known validation result, or None on a miss."""
+        if (key, value) in _KNOWN_COMMON_TAGS:
+            return True
+        cached = self._tag_cache.get((key, value))
+        if cached is None:
+            return None
+        result, timestamp = cached
+        if result or time.time() - timestamp < self.negative_cache_ttl:
+            return result
+        return None
+
     def validate_tag(self, key: str, value: str) -> bool:
         """
         Validates a tag against the OSM taginfo database.
-        
+
         Args:
             key: The OSM tag key
             value: The OSM tag value
-            
+
         Returns:
             True if the tag is valid, False otherwise
         """
+        cached = self._cached_tag_result(key, value)
+        if cached is not None:
+            return cached
         try:
             # Check if tag exists in taginfo
             url = f"{self.taginfo_base_url}/tag/show?key={key}&value={value}"
-            response = requests.get(url, timeout=10)
-            return response.status_code == 200
+            response = self.session.get(url, timeout=10)
+            result = response.status_code == 200
+            with self._cache_lock:
+                self._tag_cache[(key, value)] = (result, time.time())
+            return result
         except RequestException:
-            # If we can't reach the API, assume the tag is valid
-            # In a real implementation, you might want to cache common tags
+            # If we can't reach the API, assume the tag is valid but
+            # don't cache the assumption
             return True
-    
+
+    def are_valid(self, tags: Sequence['OsmTag']) -> List[bool]:
+        """
+        Validates several tags with a single taginfo request.
+
+        Args:
+            tags: The OSM tags to validate
+
+        Returns:
+            List of booleans in input order, True where the tag is valid
+        """
+        if not tags:
+            return []
+
+        # Serve what we can from the memo and only query the misses
+        results: List[Optional[bool]] = [
+            self._cached_tag_result(tag.key, tag.value) for tag in tags
+        ]
+        misses = [tag for tag, result in zip(tags, results) if result is None]
+        if not misses:
+            return results  # type: ignore[return-value]
+
+        try:
+            # taginfo's tags/list endpoint answers all pairs in one round-trip
+            tag_param = ",".join(f"{tag.key}={tag.value}" for tag in misses)
+            url = f"{self.taginfo_base_url}/tags/list?tags={tag_param}"
+            response = self.session.get(url, timeout=10)
+            if response.status_code == 200:
+                data = response.json()
+                if isinstance(data, dict) and isinstance(data.get('data'), list):
+                    known = {
+                        (item.get('key'), item.get('value'))
+                        for item in data['data']
+                        if isinstance(item, dict)
+                    }
+                    now = time.time()
+                    with self._cache_lock:
+                        for tag in misses:
+                            self._tag_cache[(tag.key, tag.value)] = (
+                                (tag.key, tag.value) in known, now)
+                    return [
+                        (tag.key, tag.value) in known if result is None else result
+                        for tag, result in zip(tags, results)
+                    ]
+        except (RequestException, ValueError):
+            pass
+        # If we can't reach the API, assume the unresolved tags are valid
+        # (same fallback behaviour as validate_tag), without caching
+        return [True if result is None else result for result in results]
+
     def get_valid_values(self, key: str) -> List[str]:
         """
         Returns common valid values for a given key.
@@ -175,18 +290,30 @@ class WebBasedTagValidator:
         Returns:
             List of valid values for the key
         """
+        cached = self._values_cache.get(key)
+        if cached is not None:
+            values, timestamp = cached
+            # Empty lists may just mean the API was unreachable, so only
+            # trust them for the negative-cache window
+            if values or time.time() - timestamp < self.negative_cache_ttl:
+                return values
         try:
             url = f"{self.taginfo_base_url}/key/values?key={key}&sortname=count&sortorder=desc&page=1&rp=100&qtype=key"
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 if isinstance(data, dict) and 'data' in data:
                     result_data = data['data']
                     if isinstance(result_data, list):
-                        return [item['value'] for item in result_data if isinstance(item, dict) and 'value' in item]
+                        values = [item['value'] for item in result_data if isinstance(item, dict) and 'value' in item]
+                        with self._cache_lock:
+                            self._values_cache[key] = (values, time.time())
+                        return values
         except (RequestException, ValueError):
             # If we can't reach the API or parse response, return empty list
             pass
+        with self._cache_lock:
+            self._values_cache[key] = ([], time.time())
         return []
 
 
@@ -204,38 +331,59 @@ class QuerySyntaxValidator:
         Returns:
             Tuple of (is_valid, error_message)
         """
+        # Bracket balances in a single character pass instead of four
+        # separate .count scans
+        paren_balance = 0
+        bracket_balance = 0
+        for ch in query_string:
+            if ch == '(':
+                paren_balance += 1
+            elif ch == ')':
+                paren_balance -= 1
+            elif ch == '[':
+                bracket_balance += 1
+            elif ch == ']':
+                bracket_balance -= 1
+
         # Check for basic required elements in Overpass QL
         if "[out:" not in query_string:
             return False, "Query must specify output format with [out:]"
-        
+
         if "out" not in query_string:
             return False, "Query must specify output command (out body/qt/skel)"
-        
-        if query_string.count('(') != query_string.count(')'):
+
+        if paren_balance != 0:
             return False, "Mismatched parentheses in query"
-        
-        if query_string.count('[') != query_string.count(']'):
+
+        if bracket_balance != 0:
             return False, "Mismatched brackets in query"
-        
+
         # Check for proper statement termination
-        if not query_string.strip().endswith(';'):
+        if not query_string.rstrip().endswith(';'):
             return False, "Query must end with semicolon"
-        
-        # Check for common query patterns
-        if not any(pattern in query_string.lower() for pattern in ['node[', 'way[', 'relation[']):
+
+        # Check for common query patterns; lower-case once for all four
+        # substring probes
+        qs = query_string.lower()
+        if not any(pattern in qs for pattern in ['node[', 'way[', 'relation[', 'nwr[']):
             return False, "Query should contain at least one element search (node, way, or relation)"
-        
+
         return True, ""
 
 
 class AreaResolver:
     """Resolves area names to area IDs for Overpass queries."""
-    
+
     @staticmethod
+    @functools.lru_cache(maxsize=1024)
     def resolve_area(area_name: str) -> Optional[str]:
         """
         Resolves an area name to its Overpass representation.
-        
+
+        Memoized: repeat names (common when generating many queries for
+        the same city) are served from cache, which will also skip the
+        Nominatim round-trip once real resolution is implemented.
+
         Args:
             area_name: Name of the area to resolve (e.g., "Paris", "New York")
             
@@ -270,7 +418,20 @@ class OverpassQLValidator:
         self.tag_validator = WebBasedTagValidator(self.config.taginfo_base_url)
         self.syntax_validator = QuerySyntaxValidator()
         self.area_resolver = AreaResolver()
-    
+        self.reload_config()
+
+    def reload_config(self) -> None:
+        """Re-derive the feature flags read on every validation call.
+
+        Plain instance attributes avoid going through Pydantic model
+        attribute access in the hot paths; call this again after
+        mutating self.config.
+        """
+        self._tag_validation_on = self.config.enable_tag_validation
+        self._syntax_validation_on = self.config.enable_syntax_validation
+        self._area_resolution_on = self.config.enable_area_resolution
+
+
     def validate_prompt(self, prompt: str, output_format: OutputFormat = "json") -> bool:
         """Validate a natural language prompt."""
         if not prompt or len(prompt.strip()) < 5:
@@ -281,7 +442,7 @@ class OverpassQLValidator:
         
         return True
     
-    def validate_tags(self, tags: List[OsmTag]) -> List[str]:
+    def validate_tags(self, tags: Sequence[OsmTag]) -> List[str]:
         """Validate a list of tags and return validation errors."""
         errors = []
         
@@ -289,19 +450,16 @@ class OverpassQLValidator:
             errors.append("At least one tag must be provided")
             return errors
         
-        for tag in tags:
-            try:
-                # This triggers Pydantic's field validation
-                _ = tag.key
-                _ = tag.value
-                
-                # Additional validation using web API if enabled
-                if self.config.enable_tag_validation:
-                    if not self.tag_validator.validate_tag(tag.key, tag.value):
-                        errors.append(f"Tag '{tag.key}={tag.value}' not found in OSM database")
-            except ValueError as e:
-                errors.append(f"Tag validation error: {str(e)}")
-        
+        # Field validity is already guaranteed: Pydantic validates
+        # OsmTag at construction, so there is nothing to re-check here
+
+        # Additional validation using web API if enabled: all tags go
+        # out in one batched request instead of one lookup per tag
+        if self._tag_validation_on:
+            for tag, valid in zip(tags, self.tag_validator.are_valid(tags)):
+                if not valid:
+                    errors.append(f"Tag '{tag.key}={tag.value}' not found in OSM database")
+
         return errors
     
     def validate_query(self, query: OverpassQuery) -> List[str]:
@@ -309,7 +467,7 @@ class OverpassQLValidator:
         errors = []
         
         # Check if query string is valid syntax
-        if self.config.enable_syntax_validation and query.query_string:
+        if self._syntax_validation_on and query.query_string:
             is_valid, error_msg = self.syntax_validator.validate_syntax(query.query_string)
             if not is_valid:
                 errors.append(f"Query syntax error: {error_msg}")
@@ -319,7 +477,7 @@ class OverpassQLValidator:
         errors.extend(tag_errors)
         
         # Validate geographic constraints
-        if query.search_area and self.config.enable_area_resolution:
+        if query.search_area and self._area_resolution_on:
             resolved_area = self.area_resolver.resolve_area(query.search_area)
             if not resolved_area:
                 errors.append(f"Could not resolve area: {query.search_area}")
@@ -328,14 +486,8 @@ class OverpassQLValidator:
     
     def validate_geographic_filter(self, geo_filter: GeographicFilter) -> List[str]:
         """Validate geographic filter constraints."""
-        errors = []
-        
-        try:
-            # This triggers the model validation
-            _ = geo_filter.area_name
-            _ = geo_filter.bounding_box
-            _ = geo_filter.polygon
-        except ValueError as e:
-            errors.append(f"Geographic filter validation error: {str(e)}")
+        # Pydantic runs the model validator at construction, so a
+        # GeographicFilter that exists is already consistent
+        errors: List[str] = []
         
         return errors
\ No newline at end of file